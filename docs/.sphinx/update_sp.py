@@ -6,15 +6,23 @@
 #
 # For debugging, please run this script with DEBUGGING=1
 # e.g. user@device:~/git/Canonical/sphinx-docs-starter-pack/docs$ DEBUGGING=1 python .sphinx/update_sp.py
+#
+# To update without network access, pass a local clone or tarball of the starter pack
+# with --source, or pass --offline to reuse the responses cached by a previous run
 
 
-import glob
+import argparse
+import hashlib
+import json
 import logging
 import os
 import requests
 import re
-import subprocess
 import sys
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from packaging.version import parse as parse_version
 
@@ -24,10 +32,26 @@ REQUIREMENTS = os.path.join(DOCS_DIR, "requirements.txt")
 SPHINX_UPDATE_DIR = os.path.join(SPHINX_DIR, "update")
 GITHUB_REPO = "canonical/sphinx-docs-starter-pack"
 GITHUB_API_BASE = f"https://api.github.com/repos/{GITHUB_REPO}"
-GITHUB_API_SPHINX_DIR = f"{GITHUB_API_BASE}/contents/docs/.sphinx"
-GITHUB_RAW_BASE = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main"
+GITHUB_RAW_REPO = f"https://raw.githubusercontent.com/{GITHUB_REPO}"
+# Path of the '.sphinx' dir in the starter pack
+STARTER_PACK_SPHINX_DIR = "docs/.sphinx"
 
 TIMEOUT = 10  # seconds
+CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "starter-pack-update"
+)
+MAX_WORKERS = 8  # concurrent downloads
+# Directories in '.sphinx' that aren't part of the starter pack
+EXCLUDED_DIRS = {"update", "venv", "__pycache__"}
+# The umask can only be read by setting it, so it's read once, before any threads start
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+# Shared by all requests, so they reuse pooled keep-alive connections
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+# Answer every query from the cache, set with --offline
+offline = False
 
 # Check if debugging
 if os.getenv("DEBUGGING"):
@@ -35,6 +59,11 @@ if os.getenv("DEBUGGING"):
 
 
 def main():
+    global offline
+    args = parse_arguments()
+    offline = args.offline
+    source = load_source(args.source) if args.source else None
+
     # Check local version
     logging.debug("Checking local version")
     try:
@@ -54,7 +83,14 @@ def main():
     logging.debug(f"Local version = {local_version}")
 
     # Check release version
-    latest_release = query_api(GITHUB_API_BASE + "/releases/latest").json()["tag_name"]
+    if source is not None:
+        latest_release = read_remote_file(
+            f"{STARTER_PACK_SPHINX_DIR}/version", source=source
+        ).strip()
+    else:
+        latest_release = json.loads(query_api(GITHUB_API_BASE + "/releases/latest"))[
+            "tag_name"
+        ]
     logging.debug(f"Latest release = {latest_release}")
 
     # Perform actions only if local version is older than release version
@@ -64,21 +100,15 @@ def main():
         print("Starter pack is out of date.\n")
 
         # Identify and download '.sphinx' dir files to '.sphinx/update'
-        files_updated, new_files = update_static_files()
-
-        # Write new version to file to '.sphinx/update'
-
-        download_file(
-            GITHUB_RAW_BASE + "/docs/.sphinx/version",
-            os.path.join(SPHINX_UPDATE_DIR, "version"),
-        )
+        # This includes the new version file, which differs from the local one
+        files_updated, new_files = update_static_files(latest_release, source)
 
         # Provide changelog to identify other significant changes
-        changelog = query_api(GITHUB_RAW_BASE + "/CHANGELOG.md")
+        changelog = read_remote_file("CHANGELOG.md", latest_release, source)
         logging.debug("Changelog obtained")
         version_regex = re.compile(r"#+ +" + re.escape(local_version) + r" *\n")
         print("SEE CURRENT CHANGELOG:")
-        print(re.split(version_regex, changelog.text)[0])
+        print(re.split(version_regex, changelog)[0])
 
         # Provide information on any files identified for updates
         if files_updated:
@@ -110,7 +140,9 @@ def main():
 
             local_reqs = set(file.read().splitlines()) - {""}
             requirements = set(
-                query_api(GITHUB_RAW_BASE + "/docs/requirements.txt").text.splitlines()
+                read_remote_file(
+                    "docs/requirements.txt", latest_release, source
+                ).splitlines()
             )
 
             new_requirements = requirements - local_reqs
@@ -135,71 +167,57 @@ def main():
         print("requirements.txt not checked, please update your requirements manually")
 
 
-def update_static_files():
+def update_static_files(release, source=None):
     """Checks local files against remote for new and different files, downloads to '.sphinx/updates'"""
-    files, paths = get_local_files_and_paths()
+    manifest = get_local_manifest()
+    if source is not None:
+        remote = get_source_tree(source)
+    else:
+        remote = get_remote_tree(release)
     new_file_list = []
-
-    for item in query_api(GITHUB_API_SPHINX_DIR).json():
-        logging.debug(f"Checking {item['name']}")
-        # Checks existing files in '.sphinx' starter pack static root for changed SHA
-        if item["name"] in files and item["type"] == "file":
-            index = files.index(item["name"])
-            if item["sha"] != get_git_revision_hash(paths[index]):
-                logging.debug(f"Local {item['name']} is different to remote")
-                download_file(
-                    item["download_url"], os.path.join(SPHINX_UPDATE_DIR, item["name"])
-                )
-                if item["name"] == "update_sp.py":
-                    # Indicate update script needs to be updated and re-run
-                    print("WARNING")
-                    print(
-                        "THIS UPDATE SCRIPT IS OUT OF DATE. YOU MAY NEED TO RUN ANOTHER UPDATE AFTER UPDATING TO THE FILE IN '.sphinx/updates'."
-                    )
-                    print("WARNING\n")
-            else:
+    # Paths of changed and new files, relative to '.sphinx'
+    changed = []
+
+    for path, sha in sorted(remote.items()):
+        logging.debug(f"Checking {path}")
+        # Checks existing files in '.sphinx', at any depth, for changed SHA
+        if path in manifest:
+            if sha == manifest[path]:
                 logging.debug("File hashes are equal")
-        # Checks nested files '.sphinx/**/**.*' for changed SHA (single level of depth)
-        elif item["type"] == "dir":
-            logging.debug(item["name"] + " is a directory")
-            for nested_item in query_api(
-                f"{GITHUB_API_SPHINX_DIR}/{item['name']}"
-            ).json():
-                logging.debug(f"Checking {nested_item['name']}")
-                if nested_item["name"] in files:
-                    index = files.index(nested_item["name"])
-                    if nested_item["sha"] != get_git_revision_hash(paths[index]):
-                        logging.debug(
-                            f"Local {nested_item['name']} is different to remote"
-                        )
-                        download_file(
-                            nested_item["download_url"],
-                            os.path.join(
-                                SPHINX_UPDATE_DIR, item["name"], nested_item["name"]
-                            ),
-                        )
-                # Downloads NEW nested files
-                else:
-                    logging.debug(f"No local version found of {nested_item['name']}")
-                    if nested_item["type"] == "file":
-                        new_file_list.append(nested_item["name"])
-                        download_file(
-                            nested_item["download_url"],
-                            os.path.join(
-                                SPHINX_UPDATE_DIR, item["name"], nested_item["name"]
-                            ),
-                        )
-        # Downloads NEW files in '.sphinx' starter pack static root
+                continue
+            logging.debug(f"Local {path} is different to remote")
+            if path == "update_sp.py":
+                # Indicate update script needs to be updated and re-run
+                print("WARNING")
+                print(
+                    "THIS UPDATE SCRIPT IS OUT OF DATE. YOU MAY NEED TO RUN ANOTHER UPDATE AFTER UPDATING TO THE FILE IN '.sphinx/updates'."
+                )
+                print("WARNING\n")
+        # Downloads NEW files
         else:
-            if item["type"] == "file":
-                logging.debug(f"No local version found of {item['name']}")
-                download_file(
-                    item["download_url"], os.path.join(SPHINX_UPDATE_DIR, item["name"])
+            logging.debug(f"No local version found of {path}")
+            if path != "version":
+                new_file_list.append(path)
+        changed.append(path)
+
+    if source is not None:
+        for path in changed:
+            write_file(
+                os.path.join(SPHINX_UPDATE_DIR, path),
+                source[f"{STARTER_PACK_SPHINX_DIR}/{path}"],
+            )
+    else:
+        download_files(
+            [
+                (
+                    f"{GITHUB_RAW_REPO}/{release}/{STARTER_PACK_SPHINX_DIR}/{path}",
+                    os.path.join(SPHINX_UPDATE_DIR, path),
                 )
-                if item["name"] != "version":
-                    new_file_list.append(item["name"])
+                for path in changed
+            ]
+        )
     # Writes return value for parent function
-    if os.path.exists(os.path.join(SPHINX_UPDATE_DIR)):
+    if changed:
         logging.debug("Files have been downloaded")
         files_updated = True
     else:
@@ -216,56 +234,206 @@ def update_static_files():
     return files_updated, False
 
 
-# Checks git hash of a file
-def get_git_revision_hash(file) -> str:
-    """Get SHA of local files"""
-    logging.debug(f"Getting hash of {os.path.basename(file)}")
-    return subprocess.check_output(["git", "hash-object", file]).decode("ascii").strip()
+# Computes the git hash of file content, as 'git hash-object' would
+def get_git_blob_hash(content) -> str:
+    """Get the git blob SHA-1 of the content of a file"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
 
 
 # Examines local files
-def get_local_files_and_paths():
-    """Identify '.sphinx' local files and paths"""
-    logging.debug("Checking local files and paths")
+def get_local_manifest():
+    """Map the path of each local file, relative to '.sphinx', to its git hash"""
+    logging.debug("Hashing local files")
     try:
-        files = []
-        paths = []
-        patterns = [".*", "**.*"]
-        files, paths = [], []
-
-        for pattern in patterns:
-            for file in glob.iglob(os.path.join(SPHINX_DIR, pattern), recursive=True):
-                files.append(os.path.basename(file))
-                paths.append(file)
-        return files, paths
+        manifest = {}
+        for root, dirs, files in os.walk(SPHINX_DIR):
+            if root == SPHINX_DIR:
+                dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+            for name in files:
+                path = os.path.join(root, name)
+                relative_path = os.path.relpath(path, SPHINX_DIR).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    manifest[relative_path] = get_git_blob_hash(f.read())
+        logging.debug(f"Hashed {len(manifest)} local files")
+        return manifest
     except Exception as e:
         logging.debug(e)
-        raise RuntimeError("get_local_files_and_paths()") from e
-
+        raise RuntimeError("get_local_manifest()") from e
+
+
+# Examines remote files
+def get_remote_tree(ref):
+    """Map the path of each remote file at a ref, relative to '.sphinx', to its hash"""
+    logging.debug(f"Getting remote tree at {ref}")
+    # A single recursive request covers every directory, at any depth
+    tree = json.loads(query_api(f"{GITHUB_API_BASE}/git/trees/{ref}?recursive=1"))
+    if tree.get("truncated"):
+        raise RuntimeError(f"Remote tree at {ref} is too large to list")
+    prefix = STARTER_PACK_SPHINX_DIR + "/"
+    return {
+        entry["path"][len(prefix) :]: entry["sha"]
+        for entry in tree["tree"]
+        if entry["type"] == "blob" and entry["path"].startswith(prefix)
+    }
+
+
+# Reads a local copy of the starter pack
+def load_source(path):
+    """Read the starter pack files that are checked from a local clone or tarball"""
+    logging.debug(f"Reading starter pack from {path}")
+
+    def is_checked(name):
+        return name.startswith(STARTER_PACK_SPHINX_DIR + "/") or name in (
+            "CHANGELOG.md",
+            "docs/requirements.txt",
+        )
 
-# General API query with timeout and RequestException
+    source = {}
+    try:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if d != ".git"]
+                for name in files:
+                    file = os.path.join(root, name)
+                    relative_path = os.path.relpath(file, path).replace(os.sep, "/")
+                    if is_checked(relative_path):
+                        with open(file, "rb") as f:
+                            source[relative_path] = f.read()
+        else:
+            with tarfile.open(path) as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    name = member.name.removeprefix("./")
+                    # Github tarballs have a top-level dir named after the commit
+                    if not is_checked(name):
+                        name = name.partition("/")[2]
+                    if is_checked(name):
+                        source[name] = tar.extractfile(member).read()
+    except (OSError, tarfile.TarError) as e:
+        logging.debug(e)
+        raise RuntimeError(f"Failed load_source(): {path}") from e
+    logging.debug(f"Read {len(source)} files")
+    return source
+
+
+# Examines files of a local copy of the starter pack
+def get_source_tree(source):
+    """Map the path of each file of a local copy, relative to '.sphinx', to its hash"""
+    prefix = STARTER_PACK_SPHINX_DIR + "/"
+    return {
+        name[len(prefix) :]: get_git_blob_hash(content)
+        for name, content in source.items()
+        if name.startswith(prefix)
+        and name[len(prefix) :].split("/")[0] not in EXCLUDED_DIRS
+    }
+
+
+# Reads a file of the starter pack
+def read_remote_file(path, ref=None, source=None):
+    """Get the text of a starter pack file at a ref, or from a local copy"""
+    if source is None:
+        return query_api(f"{GITHUB_RAW_REPO}/{ref}/{path}").decode()
+    if path not in source:
+        raise RuntimeError(f"{path} not found in the local starter pack")
+    return source[path].decode()
+
+
+# General API query with timeout, RequestException and cache
 def query_api(url):
-    """Query an API with a globally set timeout"""
+    """Get the body of a URL with a globally set timeout, revalidating a cached copy"""
+    cache_path = os.path.join(CACHE_DIR, hashlib.sha256(url.encode()).hexdigest())
+    try:
+        with open(cache_path, "rb") as f:
+            # Cached as a line of JSON with the response's validators, then its body
+            header, _, cached = f.read().partition(b"\n")
+        validators = json.loads(header)
+    except (OSError, ValueError):
+        cached, validators = None, {}
+
+    if offline:
+        if cached is None:
+            raise RuntimeError(f"Failed query_api(): {url} isn't cached for --offline")
+        logging.debug(f"Using cached {url}")
+        return cached
+
+    headers = {}
+    if cached is not None and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if cached is not None and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
     logging.debug(f"Querying {url}")
     try:
-        r = requests.get(url, timeout=TIMEOUT)
-        return r
+        r = session.get(url, headers=headers, timeout=TIMEOUT)
     except RequestException as e:
         raise RuntimeError(f"Failed query_api(): {url}") from e
+    if r.status_code == 304 and cached is not None:
+        logging.debug("Not modified, using cached response")
+        return cached
+    if not r.ok:
+        raise RuntimeError(f"Failed query_api(): {url} returned {r.status_code}")
+
+    validators = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+    try:
+        write_file(cache_path, json.dumps(validators).encode() + b"\n" + r.content)
+    except OSError as e:
+        logging.debug(f"Not caching {url}: {e}")
+    return r.content
 
 
 # General file download function
 def download_file(url, output_path):
-    """Download a file to a specified path"""
+    """Download a file to a specified path, replacing it atomically"""
     logging.debug(f"Downloading {os.path.basename(output_path)}")
     try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "wb") as file:
-            file.write(query_api(url).content)
+        write_file(output_path, query_api(url))
     except Exception as e:
         logging.debug(e)
         raise RuntimeError(f"Failed download_file(): {url}") from e
 
 
+# General file write function
+def write_file(output_path, content):
+    """Write a file atomically, creating its directory if needed"""
+    output_dir = os.path.dirname(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+    # Writes to a temporary file first, so an interrupted write leaves no partial file
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=output_dir, prefix=".download-", delete=False
+    ) as file:
+        file.write(content)
+    # Temporary files are private, so give it the mode that open() would have
+    os.chmod(file.name, 0o666 & ~UMASK)
+    os.replace(file.name, output_path)
+
+
+# Concurrent download of several files
+def download_files(downloads):
+    """Download (url, output path) pairs concurrently over the shared session"""
+    logging.debug(f"Downloading {len(downloads)} files")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Consumes the results, so the first failure is raised here
+        list(executor.map(lambda download: download_file(*download), downloads))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Check for updates to the starter pack"
+    )
+    parser.add_argument(
+        "--source",
+        help="Local clone or tarball of the starter pack to update from",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Answer every query from the responses cached by previous runs",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
     sys.exit(main())  # Keep return code
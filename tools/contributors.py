@@ -12,18 +12,39 @@ if sys.version_info < (3, 11):
 
 import argparse
 import base64
+import collections
+import concurrent.futures
+import contextlib
+import cProfile
+import dataclasses
+import datetime
 import functools
+import gzip
+import hashlib
 import html
+import http.client
+import io
 import json
 import logging
+import math
 import os
 import pathlib
+import pstats
+import random
 import re
+import sqlite3
+import subprocess
+import tempfile
 import textwrap
+import threading
+import time
 import tomllib
+import zlib
 from dataclasses import dataclass, field
-from typing import Any, Sequence
-from urllib.request import urlopen, Request
+from typing import Any, Collection, Iterable, Iterator, Protocol, Sequence
+from urllib.error import HTTPError
+from urllib.parse import SplitResult, unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
 
 """
 Generates a list of Github contributors to a *craft project and its craft libraries
@@ -42,18 +63,120 @@ OWNER = "canonical"
 LIBRARY_PATTERN = re.compile("^craft-.*")
 """A regex string of libraries to inspect."""
 
+LOCK_PACKAGE_PATTERN = re.compile(
+    r'^\[\[package\]\]\nname = "([^"\n]+)"\n(?:version = "([^"\n]+)"\n)?', re.MULTILINE
+)
+"""A regex string to the name and version of a package in a uv lockfile."""
+
+LOCK_PACKAGE_HEADER_PATTERN = re.compile(r"^\[\[package\]\]\s*$", re.MULTILINE)
+"""A regex string of package headers in a uv lockfile."""
+
+NOREPLY_EMAIL_PATTERN = re.compile(r"^(?:\d+\+)?([^@]+)@users\.noreply\.github\.com$")
+"""A regex string to the login from a Github noreply email address.
+
+For example, this extracts 'octocat' from '1234+octocat@users.noreply.github.com'.
+"""
+
 PR_PATTERN = re.compile(r".+?\s+\(#(\d+)\)$")
 """A regex string to the PR number from a github header.
 
 For example, this extracts '1234' from 'feat: do something (#1234)'.
 """
 
+CONVENTIONAL_PATTERN = re.compile(r"^([A-Za-z]+)(?:\(([^)]*)\))?(!)?:")
+"""A regex string to the type, scope and breaking flag of a conventional-commit header.
+
+For example, this extracts 'feat', 'cli' and '!' from 'feat(cli)!: drop a flag'.
+"""
+
 TOGGLE_TYPES = ("build", "style", "ci", "test")
 """Conventional-commit types shown as quick-toggle buttons on the report."""
 
-GITHUB_API = f"https://api.github.com/repos/{OWNER}"
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+"""Base URL of the Github API. Set GITHUB_API_URL to use a stand-in server."""
+
+GITHUB_API = f"{GITHUB_API_URL}/repos/{OWNER}"
 """URL for Github API requests."""
 
+RAW_MEDIA_TYPE = "application/vnd.github.raw+json"
+"""Media type to get file contents from the Github API without base64 encoding."""
+
+GITHUB_GRAPHQL = os.getenv("GITHUB_GRAPHQL_URL", f"{GITHUB_API_URL}/graphql")
+"""URL for Github GraphQL API requests."""
+
+GRAPHQL_PAGE_SIZE = 100
+"""Number of commits per repo in one GraphQL query (the API allows at most 100)."""
+
+PULL_REQUEST_BATCH_SIZE = 100
+"""Number of pull requests in one GraphQL query."""
+
+DEFAULT_JOBS = 8
+"""Default number of concurrent requests to Github."""
+
+COMPARE_PAGE_SIZE = 100
+"""Number of commits per page of the compare API (the API allows at most 100)."""
+
+PAGE_PREFETCH = 4
+"""Number of compare pages fetched ahead of the page being read."""
+
+COMPARE_DROPPED_MEMBERS = ("files",)
+"""Members of compare API responses that aren't used.
+
+The ``files`` member holds the diff of every changed file in the range, which
+can be tens of megabytes for a large library bump. It's dropped as the response
+streams in.
+"""
+
+STREAM_CHUNK_SIZE = 64 * 1024
+"""Size of the chunks read from a response that is filtered as it streams in."""
+
+CASSETTE_VERSION = 1
+"""Version of the format of recorded responses, see ``RecordingTransport``."""
+
+TIMEOUT = 30
+"""Timeout for Github requests, in seconds."""
+
+MAX_REDIRECTS = 5
+"""Maximum number of redirects followed for one request, e.g. for renamed repos."""
+
+MAX_RETRIES = 5
+"""Maximum number of retries for a rate-limited or failed Github request."""
+
+BACKOFF_BASE = 2.0
+"""Base delay in seconds for exponential backoff between retries."""
+
+BACKOFF_MAX = 60.0
+"""Maximum delay in seconds between retries, unless Github asks for longer."""
+
+MAX_RATE_LIMIT_WAIT = 15 * 60
+"""Maximum time in seconds to wait for the rate limit to reset before giving up."""
+
+RATE_LIMIT_RESERVE = 10
+"""Once this few requests are left, the rest are spread out until the limit resets."""
+
+CACHE_DIR = (
+    pathlib.Path(os.getenv("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache")
+    / "starflow"
+)
+"""Directory for persistent caches."""
+
+GIT_URL = "https://github.com/{owner}/{name}.git"
+"""Template for the URL of a repo to mirror with the git backend."""
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+"""Size cap for the response cache.
+
+The least recently used entries are evicted first.
+"""
+
+PINNED_REF_PATTERN = re.compile(
+    r"^(v?\d+(\.\d+)+([.+-]?[0-9A-Za-z]+)*|[0-9a-f]{7,40})$"
+)
+"""A regex string of refs that are treated as immutable: version tags and commit hashes.
+
+Responses for pinned refs are served from the cache without revalidation.
+"""
+
 AUTHOR_FILTER = {
     "Copilot",
 }
@@ -91,9 +214,44 @@ class Commit:
     author: str
     """The author of the commit."""
 
+    date: str | None = None
+    """When the commit was authored, as an ISO 8601 timestamp."""
+
     def __str__(self) -> str:
         return f"{self.author} {self.hash} {self.header}"
 
+    @functools.cached_property
+    def parsed(self) -> CommitHeader:
+        """The parts of the header, parsed on first use."""
+        return parse_header(self.header)
+
+
+@dataclass(frozen=True)
+class CommitHeader:
+    """The parts of a commit header."""
+
+    type: str | None
+    """The lowercase conventional-commit type, if the header follows the convention."""
+
+    scope: str | None
+    """The conventional-commit scope, if any."""
+
+    breaking: bool
+    """Whether the header marks a breaking change with '!'."""
+
+    pr: str | None
+    """The number of the PR that the commit came from, if any."""
+
+
+def parse_header(header: str) -> CommitHeader:
+    """Parse a commit header into its conventional-commit parts and PR number."""
+    pr_match = PR_PATTERN.match(header)
+    pr = pr_match.group(1) if pr_match else None
+    if match := CONVENTIONAL_PATTERN.match(header):
+        commit_type, scope, breaking = match.groups()
+        return CommitHeader(commit_type.lower(), scope, bool(breaking), pr)
+    return CommitHeader(None, None, False, pr)
+
 
 @dataclass
 class Repo:
@@ -111,6 +269,125 @@ class Repo:
     commits: list[Commit] = field(default_factory=list)
     """Commits between the two versions."""
 
+    pull_requests: dict[int, PullRequest] = field(default_factory=dict)
+    """Details of the PRs that the commits came from, by number, if requested."""
+
+
+@dataclass
+class PullRequest:
+    """Details of a pull request."""
+
+    number: int
+    """The PR number."""
+
+    title: str
+    """The title of the PR."""
+
+    state: str
+    """The state of the PR: 'OPEN', 'CLOSED' or 'MERGED'."""
+
+    merged_at: str | None
+    """When the PR was merged, as an ISO 8601 timestamp."""
+
+    labels: list[str]
+    """Names of the labels on the PR."""
+
+    issues: list[int]
+    """Numbers of the issues that the PR closes."""
+
+
+@dataclass
+class AuthorStats:
+    """Contributions of one author across all repos."""
+
+    login: str
+    """The author's Github login."""
+
+    commits: int = 0
+    """Number of commits by the author."""
+
+    repos: collections.Counter[str] = field(default_factory=collections.Counter)
+    """Number of commits by the author in each repo."""
+
+    pull_requests: set[tuple[str, int]] = field(default_factory=set)
+    """Repo name and number of each PR that the author's commits came from."""
+
+    first: tuple[str, Commit] | None = None
+    """Repo name and earliest commit of the author."""
+
+    last: tuple[str, Commit] | None = None
+    """Repo name and latest commit of the author."""
+
+
+@dataclass
+class RepoStats:
+    """Contributions to one repo."""
+
+    commits: int = 0
+    """Number of commits in the repo."""
+
+    authors: collections.Counter[str] = field(default_factory=collections.Counter)
+    """Number of commits by each author in the repo."""
+
+
+@dataclass
+class ContributorStats:
+    """Contributions to a set of repos, aggregated in a single pass.
+
+    Built by ``get_contributor_stats``, along with its sorted views, and shared
+    by the logs, the HTML page and the exports, so each of them only reads them.
+    """
+
+    authors: dict[str, AuthorStats] = field(default_factory=dict)
+    """Stats of each author, by login."""
+
+    repos: dict[str, RepoStats] = field(default_factory=dict)
+    """Stats of each repo with commits, by name."""
+
+    logins: list[str] = field(default_factory=list)
+    """Logins of all authors, sorted case-insensitively."""
+
+    by_commits: list[AuthorStats] = field(default_factory=list)
+    """Stats of all authors, with the most commits first."""
+
+    rst: list[str] = field(default_factory=list)
+    """References to all authors in the order of ``logins``, formatted for rst."""
+
+
+@dataclass(frozen=True)
+class CommitRange:
+    """A range of commits in a repository.
+
+    Projects released together often bump a library across the same range, so
+    this is used to fetch each range only once.
+    """
+
+    name: str
+    """Name of the repository."""
+
+    old: str
+    """Old version."""
+
+    new: str
+    """New (updated) version."""
+
+
+@dataclass
+class Project:
+    """A project and the refs to inspect."""
+
+    name: str
+    """Name of the project."""
+
+    old_ref: str
+    """The older refspec."""
+
+    new_ref: str
+    """The newer refspec."""
+
+    output: pathlib.Path
+    """Path of the HTML report."""
+
 
 # region CLI
 
@@ -125,6 +402,20 @@ def build_parser() -> argparse.ArgumentParser:
 
             Example:
               contributors --project snapcraft --old-ref 8.13.2 --new-ref 8.14.0
+
+            Batch example:
+              contributors --manifest release.toml
+
+            A manifest lists the projects to inspect, and optionally where to write
+            each report (default: contributors-<name>.html):
+
+              [[project]]
+              name = "snapcraft"
+              old-ref = "8.13.2"
+              new-ref = "8.14.0"
+              output = "snapcraft.html"
+
+            A JSON manifest with the same structure is also accepted.
             """
         ),
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -137,125 +428,2288 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--project",
-        required=True,
         help="The name of the project to inspect.",
     )
     parser.add_argument(
         "--old-ref",
-        required=True,
         dest="old_ref",
         help="The older refspec. This can be a tag or hash.",
     )
     parser.add_argument(
         "--new-ref",
-        required=True,
         dest="new_ref",
         help="The newer refspec. This can be a tag or hash.",
     )
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        default=pathlib.Path("contributors.html"),
+        help="Path of the HTML report (default: contributors.html).",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=pathlib.Path,
+        help="A TOML or JSON manifest of projects and refs to inspect in one run.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=pathlib.Path,
+        default=CACHE_DIR,
+        dest="cache_dir",
+        help=f"Directory for cached Github responses (default: {CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="cache",
+        help="Don't read or write cached Github responses.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("github", "git"),
+        default="github",
+        help=(
+            "Where to get lockfiles and commits from: the Github API, or local "
+            "git mirrors kept in the cache directory (default: github)."
+        ),
+    )
+    parser.add_argument(
+        "--git-url",
+        default=GIT_URL,
+        dest="git_url",
+        help=(
+            "URL template of the repos to mirror with the git backend. This can "
+            f"point to local repos, such as /srv/git/{{name}}.git (default: {GIT_URL})."
+        ),
+    )
+    parser.add_argument(
+        "--no-login-lookup",
+        action="store_false",
+        dest="login_lookup",
+        help=(
+            "Don't look up the Github login of commit emails with the git backend. "
+            "Authors without a noreply email or a known login are 'unknown'."
+        ),
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=(
+            "Record commits and lockfile versions in a local SQLite index, and "
+            "answer ranges of tags and hashes from it, including ranges that can be "
+            "pieced together from recorded ones."
+        ),
+    )
+    parser.add_argument(
+        "--index-stats",
+        action="store_true",
+        dest="index_stats",
+        help="Print the contributors per quarter across all indexed repos and exit.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Reuse report sections of repos whose versions haven't changed since "
+            "the last run."
+        ),
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help=(
+            "Collapse each repo's section of the report, and render its commits only "
+            "when it's expanded. Use this for releases with thousands of commits."
+        ),
+    )
+    parser.add_argument(
+        "--pull-requests",
+        action="store_true",
+        dest="pull_requests",
+        help=(
+            "Get the title, labels, merge date and closed issues of each PR in batched "
+            "GraphQL queries, and show them in the report. Requires GITHUB_TOKEN."
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=("json", "ndjson"),
+        help=(
+            "Also export the versions, commits and contributors next to each report, "
+            "e.g. to contributors.json. Commits are written as they're fetched."
+        ),
+    )
+    parser.add_argument(
+        "--graphql",
+        action="store_true",
+        help=(
+            "Batch lockfile and commit queries into a few Github GraphQL requests. "
+            "Requires GITHUB_TOKEN."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=DEFAULT_JOBS,
+        help=(
+            "The maximum number of concurrent requests to Github "
+            f"(default: {DEFAULT_JOBS})."
+        ),
+    )
+    parser.add_argument(
+        "--record",
+        type=pathlib.Path,
+        help=(
+            "Record the Github responses of the run to a compressed cassette file, "
+            "to replay later with --replay. The response cache isn't used."
+        ),
+    )
+    parser.add_argument(
+        "--replay",
+        type=pathlib.Path,
+        help=(
+            "Serve Github requests from a cassette written by --record, without "
+            "network access or a token."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        help="Write cProfile stats of the run to a file, for python -m pstats.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=pathlib.Path,
+        help=(
+            "Write a Chrome trace of the phases and requests of the run to a JSON "
+            "file, for chrome://tracing or https://ui.perfetto.dev."
+        ),
+    )
+
+    return parser
+
+
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer from the command line."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not an integer") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value!r} must be at least 1")
+    return number
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    """Parse command line args."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    single = (args.project, args.old_ref, args.new_ref)
+    if args.manifest and any(single):
+        parser.error("--manifest can't be used with --project, --old-ref or --new-ref")
+    if args.manifest and args.output != parser.get_default("output"):
+        parser.error(
+            "--manifest can't be used with --output, set each output in the manifest"
+        )
+    if args.index_stats:
+        return args
+    if not args.manifest and not all(single):
+        parser.error(
+            "--project, --old-ref and --new-ref are required without --manifest"
+        )
+    if args.graphql and args.backend != "github":
+        parser.error("--graphql can only be used with the github backend")
+    if not args.login_lookup and args.backend != "git":
+        parser.error("--no-login-lookup can only be used with the git backend")
+    if args.record and args.replay:
+        parser.error("--record can't be used with --replay")
+    if (args.record or args.replay) and args.backend != "github":
+        parser.error("--record and --replay can only be used with the github backend")
+    return args
+
+
+def load_manifest(path: pathlib.Path) -> list[Project]:
+    """Load the projects and refs to inspect from a TOML or JSON manifest.
+
+    :raises ValueError: if the manifest is invalid.
+    """
+    text = path.read_text(encoding="utf-8")
+    try:
+        data = json.loads(text) if path.suffix == ".json" else tomllib.loads(text)
+    except (json.JSONDecodeError, tomllib.TOMLDecodeError) as e:
+        raise ValueError(f"{path} isn't a valid manifest: {e}") from e
+
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must be a table with a list of projects.")
+    entries = data.get("project", [])
+    if not isinstance(entries, list) or not all(
+        isinstance(entry, dict) for entry in entries
+    ):
+        raise ValueError(f"The projects in {path} must be a list of tables.")
+
+    projects: list[Project] = []
+    for entry in entries:
+        if not all(isinstance(entry.get(key, ""), str) for key in ("name", "output")):
+            raise ValueError(f"Project names and outputs in {path} must be strings.")
+        try:
+            name = entry["name"]
+            projects.append(
+                Project(
+                    name=name,
+                    old_ref=str(entry["old-ref"]),
+                    new_ref=str(entry["new-ref"]),
+                    output=pathlib.Path(
+                        entry.get("output", f"contributors-{name}.html")
+                    ),
+                )
+            )
+        except KeyError as e:
+            raise ValueError(f"A project in {path} is missing {e}.") from None
+    if not projects:
+        raise ValueError(f"{path} doesn't list any projects.")
+    outputs = [project.output for project in projects]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError(f"Projects in {path} must write to different outputs.")
+    return projects
+
+
+def set_verbosity(verbose: bool) -> None:
+    """Set the logging level to info or debug."""
+    if verbose:
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.propagate = False
+
+
+# endregion
+# region instrumentation
+
+
+@dataclass
+class Span:
+    """A timed piece of work, such as a phase of the run or a single request."""
+
+    name: str
+    """What was timed, e.g. 'commits' or the URL of a request."""
+
+    category: str
+    """The kind of work: 'phase', 'request', 'lockfile', 'parse' or 'commits'."""
+
+    start: float
+    """When the work started, in seconds on the ``time.perf_counter`` clock."""
+
+    duration: float
+    """How long the work took, in seconds."""
+
+    thread: str
+    """The name of the thread that did the work."""
+
+    args: dict[str, Any] = field(default_factory=dict)
+    """Details of the work, e.g. the status and size of a response."""
+
+
+class Tracer:
+    """Record timed spans of work from any thread.
+
+    Spans are cheap enough to always record. They're summarized at the end of
+    verbose runs, and can be exported as a Chrome trace to see concurrent
+    requests on a timeline (open it in chrome://tracing or https://ui.perfetto.dev).
+    """
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, category: str = "phase", **args: Any
+    ) -> Iterator[dict[str, Any]]:
+        """Time the work done in a ``with`` block.
+
+        :returns: a dict of details that the block can fill in as it goes.
+        """
+        details = dict(args)
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            span = Span(
+                name,
+                category,
+                start,
+                time.perf_counter() - start,
+                threading.current_thread().name,
+                details,
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    def log_summary(self) -> None:
+        """Log the time of each phase and a summary of the requests sent."""
+        phases = [span for span in self.spans if span.category == "phase"]
+        requests = [span for span in self.spans if span.category == "request"]
+        totals: dict[str, list[float]] = collections.defaultdict(list)
+        for span in self.spans:
+            if span.category not in ("phase", "request"):
+                totals[span.category].append(span.duration)
+
+        logger.info("\nPhases:")
+        for span in phases:
+            logger.info(f"  {span.name:<12} {span.duration:8.3f}s")
+        if totals:
+            logger.info("Work, summed across threads:")
+        for category, durations in sorted(totals.items()):
+            logger.info(
+                f"  {category:<12} {sum(durations):8.3f}s in {len(durations)} "
+                f"(max {max(durations):.3f}s)"
+            )
+
+        if not requests:
+            return
+        cache = collections.Counter(span.args.get("cache") for span in requests)
+        size = sum(span.args.get("bytes", 0) for span in requests)
+        latencies = sorted(span.duration for span in requests)
+        remaining = [
+            span.args["remaining"] for span in requests if span.args.get("remaining")
+        ]
+        logger.info(
+            f"Requests: {len(requests)} ({cache['hit']} cache hits, "
+            f"{cache['revalidated']} revalidated, {cache['miss']} misses), "
+            f"{size / 2**20:.1f} MiB, latency median "
+            f"{latencies[len(latencies) // 2]:.3f}s, max {latencies[-1]:.3f}s"
+            + (f", rate limit {remaining[-1]} left" if remaining else "")
+        )
+        logger.info("Slowest requests:")
+        for span in sorted(requests, key=lambda span: span.duration, reverse=True)[:5]:
+            status = span.args.get("status", "-")
+            url = span.args.get("url", span.name)
+            logger.info(f"  {span.duration:8.3f}s {status} {url}")
+
+    def write_chrome_trace(self, path: pathlib.Path) -> None:
+        """Write the spans as Chrome trace events."""
+        with self._lock:
+            spans = list(self.spans)
+        origin = min((span.start for span in spans), default=0.0)
+        threads: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in sorted(spans, key=lambda span: span.start):
+            if span.thread not in threads:
+                threads[span.thread] = len(threads) + 1
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": 1,
+                        "tid": threads[span.thread],
+                        "args": {"name": span.thread},
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": round((span.start - origin) * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": 1,
+                    "tid": threads[span.thread],
+                    "args": span.args,
+                }
+            )
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+        logger.info(f"Wrote trace: file://{path.absolute()}")
+
+
+_tracer = Tracer()
+
+
+class Profiler:
+    """Profile the main thread and the worker threads started while profiling.
+
+    cProfile only profiles the thread that enables it, so each worker thread
+    gets its own profiler and the stats are merged when they're written.
+    """
+
+    def __init__(self) -> None:
+        self._main = cProfile.Profile()
+        self._threads: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, *args: Any) -> None:
+        """Start a profiler in a new thread, on the first event of the thread."""
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._threads.append(profiler)
+        profiler.enable()
+
+    def enable(self) -> None:
+        """Start profiling."""
+        self._main.enable()
+        if sys.version_info < (3, 12):
+            # from 3.12, cProfile uses sys.monitoring, which sees every thread
+            threading.setprofile(self._start_thread)
+
+    def dump(self, path: pathlib.Path) -> None:
+        """Stop profiling and write the merged stats to a file."""
+        threading.setprofile(None)  # type: ignore[arg-type]
+        self._main.disable()
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for profiler in self._threads:
+                stats.add(profiler)
+        stats.dump_stats(path)
+        logger.info(f"Wrote profile: {path.absolute()} (view it with python -m pstats)")
+
+
+# endregion
+# region response cache
+
+
+def write_atomically(path: pathlib.Path, data: Any, **kwargs: Any) -> None:
+    """Write data to a JSON file, replacing it only once the data is complete.
+
+    The data is written to a temporary file in the same directory, which is
+    removed if writing fails.
+
+    :param kwargs: extra arguments for ``json.dump``.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, suffix=".tmp", delete=False
+    ) as f:
+        try:
+            json.dump(data, f, **kwargs)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+
+@dataclass
+class CacheEntry:
+    """A cached Github response."""
+
+    url: str
+    """The requested URL."""
+
+    body: str
+    """The decoded response body."""
+
+    etag: str | None = None
+    """The ETag used to revalidate the entry."""
+
+    pinned: bool = False
+    """Whether the response is for immutable refs and never needs revalidation."""
+
+
+class ResponseCache:
+    """A persistent, size-capped cache of Github responses.
+
+    Each entry is a JSON file named after a hash of the request URL, its
+    ``Accept`` header and the auth identity, so responses fetched with a token
+    are never served to an anonymous run and vice versa.
+    Reading an entry refreshes its modification time, which is used to evict
+    the least recently used entries once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path, max_bytes: int = CACHE_MAX_BYTES
+    ) -> None:
+        self.directory = directory / "http"
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, url: str, headers: dict[str, str]) -> str:
+        """Get the cache key for a request."""
+        identity = hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()
+        parts = (url, headers.get("Accept", ""), identity)
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Get an entry from the cache, marking it as recently used."""
+        path = self.directory / f"{key}.json"
+        try:
+            entry = CacheEntry(**json.loads(path.read_text(encoding="utf-8")))
+            path.touch()
+        except (OSError, ValueError, TypeError):
+            return None
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """Atomically write an entry to the cache."""
+        write_atomically(self.directory / f"{key}.json", entry.__dict__)
+
+    def prune(self) -> None:
+        """Evict the least recently used entries until the cache fits its size cap."""
+        entries = [(path, path.stat()) for path in self.directory.glob("*.json")]
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            logger.debug(f"Evicting {path.name} from the response cache")
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+
+_cache: ResponseCache | None = None
+
+
+def set_cache(directory: pathlib.Path | None) -> None:
+    """Enable the response cache in a directory, or disable it with ``None``."""
+    global _cache
+    _cache = ResponseCache(directory) if directory else None
+
+
+def is_pinned_ref(ref: str) -> bool:
+    """Check if a ref looks like a version tag or commit hash."""
+    return bool(PINNED_REF_PATTERN.match(ref))
+
+
+# endregion
+# region HTTP client
+
+
+@dataclass
+class Response:
+    """A complete HTTP response."""
+
+    url: str
+    """The URL that produced the response, after redirects."""
+
+    status: int
+    """The HTTP status code."""
+
+    headers: http.client.HTTPMessage
+    """The response headers."""
+
+    body: bytes
+    """The decompressed response body."""
+
+    def raise_for_status(self) -> None:
+        """Raise an error for a 4xx or 5xx status.
+
+        :raises HTTPError: if the status is an error.
+        """
+        if self.status >= 400:
+            raise HTTPError(
+                self.url,
+                self.status,
+                http.client.responses.get(self.status, ""),
+                self.headers,
+                io.BytesIO(self.body),
+            )
+
+
+class JsonMemberFilter:
+    """Drop members of the top-level object from a stream of JSON bytes.
+
+    The values of dropped members are replaced with ``null`` as they stream
+    past, so a large value, such as the diffs in a compare API response, is
+    never held in memory. Chunks may split the JSON anywhere, including inside
+    strings and escape sequences.
+
+    Only the top level is tokenized. Nested values are skipped with regexes, a
+    flat object or array and a run of scalars at a time.
+    """
+
+    _STRING = rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    _TOKEN = re.compile(rb'["{}\[\],:]')
+    _STRING_BODY = re.compile(rb'[^"\\]*+(?:\\.[^"\\]*+)*+')
+    _NESTED_SCALARS = re.compile(rb'(?:[^"{}\[\]]++|' + _STRING + rb")*+")
+    _FLAT_CONTAINER = re.compile(rb'[{\[](?:[^"{}\[\]]++|' + _STRING + rb")*+[}\]]")
+
+    def __init__(self, members: Collection[str]) -> None:
+        self._members = {member.encode("utf-8") for member in members}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key: bytearray | None = None
+        self._drop_next = False
+        self._dropping = False
+
+    def feed(self, data: bytes) -> bytes:
+        """Filter the next chunk of the stream.
+
+        :returns: the filtered bytes of the chunk.
+        """
+        if not data:
+            # decompressors can return empty chunks, which mustn't touch the state
+            return b""
+        out: list[bytes] = []
+        emit = pos = 0
+        if self._escape:
+            # the previous chunk ended with a backslash, so skip the escaped byte
+            pos, self._escape = 1, False
+            if self._key is not None:
+                self._key += data[:1]
+        while pos < len(data):
+            if self._in_string:
+                pos = self._read_string(data, pos)
+                continue
+
+            if self._depth > 1:
+                match = self._NESTED_SCALARS.match(data, pos)
+                pos = match.end()  # type: ignore[union-attr]
+                if pos == len(data):
+                    break
+                token = data[pos]
+                pos += 1
+                if token == ord('"'):
+                    # a string that continues in the next chunk
+                    self._in_string = True
+                elif token in b"{[":
+                    if flat := self._FLAT_CONTAINER.match(data, pos - 1):
+                        pos = flat.end()
+                    else:
+                        self._depth += 1
+                else:
+                    self._depth -= 1
+                continue
+
+            match = self._TOKEN.search(data, pos)
+            if not match:
+                break
+            token, pos = data[match.start()], match.end()
+            if token == ord('"'):
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key = bytearray()
+                self._expect_key = False
+            elif token in b"{[":
+                if self._depth and (flat := self._FLAT_CONTAINER.match(data, pos - 1)):
+                    pos = flat.end()
+                    continue
+                self._depth += 1
+                self._expect_key = self._depth == 1 and token == ord("{")
+            elif token in b"}]":
+                self._depth -= 1
+                if self._dropping:
+                    self._dropping = False
+                    emit = match.start()
+            elif self._depth != 1:
+                continue
+            elif token == ord(","):
+                if self._dropping:
+                    self._dropping = False
+                    emit = match.start()
+                self._expect_key = True
+            elif self._drop_next:
+                # the separator of a dropped member
+                self._drop_next = False
+                self._dropping = True
+                out.append(data[emit:pos])
+                out.append(b"null")
+        if not self._dropping:
+            out.append(data[emit:])
+        return b"".join(out)
+
+    def _read_string(self, data: bytes, pos: int) -> int:
+        """Read the rest of a string, or as much of it as is in the chunk.
+
+        :returns: the position after the string.
+        """
+        end = self._STRING_BODY.match(data, pos).end()  # type: ignore[union-attr]
+        if self._key is not None:
+            self._key += data[pos:end]
+        if end == len(data):
+            return end
+        if data[end] == ord("\\"):
+            self._escape = True
+            if self._key is not None:
+                self._key += data[end:]
+            return len(data)
+        self._in_string = False
+        if self._key is not None:
+            self._drop_next = bytes(self._key) in self._members
+            self._key = None
+        return end + 1
+
+
+class ConnectionPool:
+    """A thread-safe pool of keep-alive HTTP connections.
+
+    Idle connections are kept per scheme and host, so consecutive requests to
+    api.github.com reuse an open TLS connection instead of repeating the TCP and
+    TLS handshakes. Responses are requested gzip-compressed.
+
+    Like ``urlopen``, requests go through the proxies set in the ``http_proxy``
+    and ``https_proxy`` environment variables, except for hosts in ``no_proxy``.
+    HTTPS requests are tunneled through the proxy with ``CONNECT``.
+    """
+
+    def __init__(self, timeout: float = TIMEOUT) -> None:
+        self.timeout = timeout
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = (
+            collections.defaultdict(list)
+        )
+        self._lock = threading.Lock()
+        self._proxies = getproxies()
+        self._routes: dict[tuple[str, str], SplitResult | None] = {}
+
+    def _get_proxy(self, scheme: str, netloc: str) -> SplitResult | None:
+        """Get the proxy to send requests to a host through, if any."""
+        try:
+            return self._routes[scheme, netloc]
+        except KeyError:
+            pass
+        proxy = None
+        if (url := self._proxies.get(scheme)) and not proxy_bypass(netloc):
+            proxy = urlsplit(url if "://" in url else f"http://{url}")
+        self._routes[scheme, netloc] = proxy
+        return proxy
+
+    @staticmethod
+    def _get_proxy_headers(proxy: SplitResult) -> dict[str, str]:
+        """Get the headers that authenticate with a proxy, if it has credentials."""
+        if proxy.username is None:
+            return {}
+        credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+        token = base64.b64encode(credentials.encode()).decode()
+        return {"Proxy-Authorization": f"Basic {token}"}
+
+    def _acquire(
+        self, scheme: str, netloc: str
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        """Get an idle connection to a host, or a new one.
+
+        :returns: the connection and whether it was reused.
+        """
+        with self._lock:
+            if idle := self._idle[scheme, netloc]:
+                return idle.pop(), True
+        proxy = self._get_proxy(scheme, netloc)
+        if proxy is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        elif scheme == "https":
+            conn = http.client.HTTPSConnection(
+                proxy.hostname, proxy.port, timeout=self.timeout
+            )
+            conn.set_tunnel(netloc, headers=self._get_proxy_headers(proxy))
+        else:
+            conn = http.client.HTTPConnection(
+                proxy.hostname, proxy.port, timeout=self.timeout
+            )
+        return conn, False
+
+    def _release(
+        self, scheme: str, netloc: str, conn: http.client.HTTPConnection
+    ) -> None:
+        """Return a connection to the pool."""
+        with self._lock:
+            self._idle[scheme, netloc].append(conn)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes | None,
+        drop: Collection[str],
+    ) -> Response:
+        """Send a single request, without following redirects."""
+        parts = urlsplit(url)
+        path = (
+            f"{parts.path or '/'}?{parts.query}" if parts.query else parts.path or "/"
+        )
+        headers = {**headers, "Accept-Encoding": "gzip"}
+        if parts.scheme == "http" and (proxy := self._get_proxy("http", parts.netloc)):
+            # plain HTTP requests are sent to the proxy with the full URL
+            path = url
+            headers.update(self._get_proxy_headers(proxy))
+        conn, reused = self._acquire(parts.scheme, parts.netloc)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            if drop and resp.status == 200:
+                data = self._read_filtered(resp, drop)
+            else:
+                data = resp.read()
+                if resp.getheader("Content-Encoding") == "gzip":
+                    data = gzip.decompress(data)
+        except (http.client.HTTPException, ConnectionError):
+            conn.close()
+            if not reused:
+                raise
+            # the server closed an idle keep-alive connection, so retry on a new one
+            logger.debug(f"Reconnecting to {parts.netloc}")
+            return self._send(method, url, headers, body, drop)
+        except BaseException:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(parts.scheme, parts.netloc, conn)
+        return Response(url, resp.status, resp.headers, data)
+
+    @staticmethod
+    def _read_filtered(resp: http.client.HTTPResponse, drop: Collection[str]) -> bytes:
+        """Read a JSON response in chunks, dropping top-level members as they arrive."""
+        json_filter = JsonMemberFilter(drop)
+        decompressor = None
+        if resp.getheader("Content-Encoding") == "gzip":
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        chunks: list[bytes] = []
+        while chunk := resp.read(STREAM_CHUNK_SIZE):
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            chunks.append(json_filter.feed(chunk))
+        if decompressor:
+            chunks.append(json_filter.feed(decompressor.flush()))
+        return b"".join(chunks)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes | None = None,
+        *,
+        drop: Collection[str] = (),
+    ) -> Response:
+        """Send a request, following redirects.
+
+        The ``Authorization`` header is dropped when a redirect leads to another
+        scheme or host, so credentials are only sent to the origin they're for.
+
+        :param drop: members of a JSON response's top-level object to replace
+            with ``null`` as the response streams in.
+        :raises HTTPError: if the server responds with a 4xx or 5xx status.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, headers, body, drop)
+            location = response.headers.get("Location")
+            if response.status not in (301, 302, 307, 308) or not location:
+                break
+            target = urljoin(url, location)
+            old, new = urlsplit(url), urlsplit(target)
+            if (old.scheme, old.netloc) != (new.scheme, new.netloc):
+                headers = {
+                    name: value
+                    for name, value in headers.items()
+                    if name.lower() != "authorization"
+                }
+            url = target
+            logger.debug(f"Following redirect to {url}")
+        response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+class Transport(Protocol):
+    """Sends the HTTP requests of the Github API client."""
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes | None = None,
+        *,
+        drop: Collection[str] = (),
+    ) -> Response:
+        """Send a request, following redirects.
+
+        :param drop: members of a JSON response's top-level object to replace
+            with ``null``.
+        :raises HTTPError: if the server responds with a 4xx or 5xx status.
+        """
+        ...
+
+    def close(self) -> None:
+        """Release resources and save state at the end of a run."""
+        ...
+
+
+_transport: Transport = ConnectionPool()
+
+
+def set_transport(transport: Transport) -> None:
+    """Set how requests are sent."""
+    global _transport
+    _transport = transport
+
+
+# endregion
+# region record and replay
+
+
+def get_interaction_key(
+    method: str, url: str, headers: dict[str, str], body: bytes | None
+) -> str:
+    """Identify a request in a cassette.
+
+    Credentials and conditional headers aren't part of the key, so a cassette
+    can be replayed without a token or a cache.
+    """
+    digest = hashlib.sha256(body or b"").hexdigest()
+    return f"{method} {url} {headers.get('Accept', '')} {digest}"
+
+
+class RecordingTransport:
+    """Send requests with another transport, and record the responses in a cassette.
+
+    A cassette is a gzip-compressed JSON file, written when the transport is
+    closed. Responses are recorded as they were returned, after dropped
+    members were filtered out. Error responses are recorded too, so that a
+    replay fails in the same way.
+    """
+
+    def __init__(self, transport: Transport, path: pathlib.Path) -> None:
+        self.transport = transport
+        self.path = path
+        self._interactions: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes | None = None,
+        *,
+        drop: Collection[str] = (),
+    ) -> Response:
+        """Send a request and record its response."""
+        key = get_interaction_key(method, url, headers, body)
+        try:
+            response = self.transport.request(method, url, headers, body, drop=drop)
+        except HTTPError as e:
+            data = e.read()
+            e.fp.seek(0)
+            self._record(key, Response(e.url, e.code, e.headers, data))
+            raise
+        self._record(key, response)
+        return response
+
+    def _record(self, key: str, response: Response) -> None:
+        """Record a response, replacing an earlier response to the same request."""
+        try:
+            body, encoding = response.body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(response.body).decode("ascii"), "base64"
+        interaction = {
+            "request": key,
+            "url": response.url,
+            "status": response.status,
+            "headers": list(response.headers.items()),
+            "encoding": encoding,
+            "body": body,
+        }
+        with self._lock:
+            self._interactions[key] = interaction
+
+    def close(self) -> None:
+        """Close the wrapped transport and write the cassette."""
+        self.transport.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            interactions = list(self._interactions.values())
+        data = {"version": CASSETTE_VERSION, "interactions": interactions}
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f)
+        logger.info(f"Recorded {len(data['interactions'])} responses to {self.path}")
+
+
+class ReplayTransport:
+    """Serve requests from a cassette written by ``RecordingTransport``.
+
+    Nothing is sent over the network, so a recorded run can be repeated offline
+    and without a token.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Load a cassette.
+
+        :raises OSError: if the cassette can't be read.
+        :raises ValueError: if the file isn't a cassette.
+        """
+        self.path = path
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            raise ValueError(f"{path} isn't a valid cassette: {e}") from e
+        if not isinstance(data, dict) or data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"{path} isn't a cassette of version {CASSETTE_VERSION}.")
+        self._interactions: dict[str, dict[str, Any]] = {
+            interaction["request"]: interaction for interaction in data["interactions"]
+        }
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: bytes | None = None,
+        *,
+        drop: Collection[str] = (),
+    ) -> Response:
+        """Get the recorded response to a request.
+
+        :raises RuntimeError: if the request wasn't recorded.
+        :raises HTTPError: if the recorded response is a 4xx or 5xx status.
+        """
+        key = get_interaction_key(method, url, headers, body)
+        interaction = self._interactions.get(key)
+        if interaction is None:
+            raise RuntimeError(
+                f"{self.path} has no recorded response for {method} {url}"
+            )
+        message = http.client.HTTPMessage()
+        for name, value in interaction["headers"]:
+            message[name] = value
+        if interaction["encoding"] == "base64":
+            data = base64.b64decode(interaction["body"])
+        else:
+            data = interaction["body"].encode("utf-8")
+        response = Response(interaction["url"], interaction["status"], message, data)
+        response.raise_for_status()
+        return response
+
+    def close(self) -> None:
+        """Nothing to do, the cassette is only read."""
+
+
+# endregion
+# region rate limiting
+
+
+@dataclass
+class RateLimit:
+    """The state of a Github rate limit, from the latest response headers."""
+
+    limit: int | None = None
+    """The maximum number of requests per window."""
+
+    remaining: int | None = None
+    """The number of requests left in the current window."""
+
+    reset: float | None = None
+    """When the current window resets, as a Unix timestamp."""
+
+
+class RateLimiter:
+    """Schedule Github requests around the rate limit.
+
+    The remaining budget of each rate limit resource ("core" for REST,
+    "graphql" for GraphQL) is tracked from the ``X-RateLimit-*`` headers of every
+    response. Once the budget runs low, requests are spread out until the
+    window resets, and when it runs out they wait for the reset.
+    ``Retry-After`` and backoff delays pause all requests, not only the one that
+    was rejected.
+    """
+
+    def __init__(self) -> None:
+        self._limits: dict[str, RateLimit] = collections.defaultdict(RateLimit)
+        self._next_slot: dict[str, float] = collections.defaultdict(float)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.retries = 0
+
+    def acquire(self, resource: str) -> None:
+        """Block until a request for a resource can be sent.
+
+        :raises RuntimeError: if the rate limit won't reset within
+            ``MAX_RATE_LIMIT_WAIT``.
+        """
+        with self._lock:
+            now = time.time()
+            paused_until = self._paused_until
+            start = max(now, paused_until)
+            rate = self._limits[resource]
+            if rate.reset is not None and now >= rate.reset:
+                rate.remaining, rate.reset = rate.limit, None
+            if rate.remaining is not None and rate.remaining <= RATE_LIMIT_RESERVE:
+                reset = rate.reset or now
+                if rate.remaining <= 0:
+                    start = max(start, reset)
+                else:
+                    start = max(start, self._next_slot[resource])
+                    self._next_slot[resource] = start + (reset - now) / rate.remaining
+                rate.remaining -= 1
+            self.requests += 1
+        delay = start - now
+        if delay > MAX_RATE_LIMIT_WAIT:
+            raise RuntimeError(
+                f"The Github {resource} rate limit is exhausted for another "
+                f"{delay:.0f}s."
+            )
+        if delay > 0:
+            if start > paused_until:
+                logger.info(
+                    f"Waiting {delay:.1f}s for the Github {resource} rate limit."
+                )
+            time.sleep(delay)
+
+    def update(
+        self, resource: str, status: int, headers: http.client.HTTPMessage
+    ) -> None:
+        """Record the rate limit state from response headers."""
+        resource = headers.get("X-RateLimit-Resource", resource)
+        with self._lock:
+            rate = self._limits[resource]
+            if limit := headers.get("X-RateLimit-Limit"):
+                rate.limit = int(limit)
+            if remaining := headers.get("X-RateLimit-Remaining"):
+                rate.remaining = int(remaining)
+            if reset := headers.get("X-RateLimit-Reset"):
+                rate.reset = float(reset)
+            if status == 304:
+                self.not_modified += 1
+
+    def pause(self, delay: float) -> None:
+        """Hold back all requests for a number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + delay)
+            self.retries += 1
+
+    def summary(self) -> str:
+        """Summarize the requests sent and the quota left."""
+        parts = [
+            f"{self.requests} Github requests "
+            f"({self.not_modified} not modified, {self.retries} retried)"
+        ]
+        for resource, rate in sorted(self._limits.items()):
+            if rate.remaining is not None and rate.limit is not None:
+                parts.append(f"{resource}: {max(rate.remaining, 0)}/{rate.limit} left")
+        return ", ".join(parts)
+
+
+_rate_limiter = RateLimiter()
+
+_request_slots = threading.BoundedSemaphore(DEFAULT_JOBS)
+"""Bounds the requests in flight across all threads, including page prefetches."""
+
+
+def set_max_requests(count: int) -> None:
+    """Set the maximum number of concurrent requests to Github."""
+    global _request_slots
+    _request_slots = threading.BoundedSemaphore(count)
+
+
+def get_retry_delay(error: HTTPError, attempt: int) -> float | None:
+    """Get the delay before retrying a failed request.
+
+    :returns: the delay in seconds, or ``None`` if the request shouldn't be retried.
+    """
+    if error.code == 403:
+        body = error.read()
+        error.fp.seek(0)
+        if not (
+            error.headers.get("Retry-After")
+            or error.headers.get("X-RateLimit-Remaining") == "0"
+            or b"rate limit" in body.lower()
+        ):
+            # a permission error rather than a rate limit
+            return None
+    elif error.code != 429 and error.code < 500:
+        return None
+
+    if retry_after := error.headers.get("Retry-After"):
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    if error.headers.get("X-RateLimit-Remaining") == "0":
+        if reset := error.headers.get("X-RateLimit-Reset"):
+            return max(float(reset) - time.time(), 0) + 1
+    backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+    return random.uniform(backoff / 2, backoff)
+
+
+def request_github(
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    body: bytes | None = None,
+    *,
+    drop: Collection[str] = (),
+) -> Response:
+    """Send a request to Github, pacing it with the rate limiter.
+
+    Rate-limited requests and server errors are retried with jittered
+    exponential backoff, or after the delay Github asks for.
+
+    :param drop: members of the JSON response to discard as it streams in.
+    """
+    resource = "graphql" if url == GITHUB_GRAPHQL else "core"
+    attempt = 0
+    while True:
+        _rate_limiter.acquire(resource)
+        try:
+            with _request_slots:
+                response = _transport.request(method, url, headers, body, drop=drop)
+        except HTTPError as e:
+            _rate_limiter.update(resource, e.code, e.headers)
+            delay = get_retry_delay(e, attempt)
+            if delay is None or delay > MAX_RATE_LIMIT_WAIT or attempt >= MAX_RETRIES:
+                raise
+            logger.warning(f"Github responded with {e.code}, retrying in {delay:.1f}s.")
+            _rate_limiter.pause(delay)
+            attempt += 1
+            continue
+        _rate_limiter.update(resource, response.status, response.headers)
+        return response
+
+
+# endregion
+# region Github API
+
+
+# caching means we only log the warning once
+@functools.lru_cache(maxsize=1)
+def get_token() -> str | None:
+    """Get the github token from the environment."""
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        logger.info("Couldn't find GITHUB_TOKEN in the environment.")
+        logger.info("You'll be rate-limited and restricted to public repos.")
+        logger.info(
+            "To generate a token, go to https://github.com/settings/personal-access-tokens"
+        )
+        logger.info("For public projects, the token doesn't need any permissions.")
+    return token
+
+
+@functools.lru_cache(maxsize=1)
+def get_headers() -> dict[str, str]:
+    """Get headers for a Github API request."""
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+    }
+    if token := get_token():
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def fetch_github(
+    url: str,
+    *,
+    pinned: bool = False,
+    accept: str | None = None,
+    drop: Collection[str] = (),
+) -> str:
+    """Fetch a github URL and return the response body.
+
+    With the response cache enabled, pinned responses are returned straight from
+    the cache and other cached responses are revalidated with their ETag.
+    A ``304 Not Modified`` doesn't count against the rate limit.
+
+    :param accept: a media type to request instead of the default JSON.
+    :param drop: members of the JSON response to discard as it streams in. They
+        are neither kept in memory nor cached.
+    """
+    headers = dict(get_headers())
+    if accept:
+        headers["Accept"] = accept
+    cache = _cache
+    key = entry = None
+    with _tracer.span(urlsplit(url).path, "request", url=url) as details:
+        if cache:
+            key = cache.key(url, headers)
+            entry = cache.get(key)
+            if entry and entry.pinned:
+                logger.debug(f"Using cached {url}")
+                details["cache"] = "hit"
+                return entry.body
+            if entry and entry.etag:
+                headers["If-None-Match"] = entry.etag
+            details["cache"] = "miss"
+
+        logger.debug(f"Querying {url}")
+        response = trace_request(details, "GET", url, headers, drop=drop)
+        if response.status == 304 and entry:
+            logger.debug(f"Cached {url} is still valid")
+            details["cache"] = "revalidated"
+            return entry.body
+        body = response.body.decode("utf-8")
+        etag = response.headers.get("ETag")
+
+    if cache and key and (etag or pinned):
+        cache.put(key, CacheEntry(url, body, etag, pinned))
+    return body
+
+
+def trace_request(
+    details: dict[str, Any],
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    body: bytes | None = None,
+    *,
+    drop: Collection[str] = (),
+) -> Response:
+    """Send a request to Github and record the response in the details of a span."""
+    try:
+        response = request_github(method, url, headers, body, drop=drop)
+    except HTTPError as e:
+        details["status"] = e.code
+        raise
+    details["status"] = response.status
+    details["bytes"] = len(response.body)
+    details["remaining"] = response.headers.get("X-RateLimit-Remaining")
+    return response
+
+
+def query_github(
+    url: str, *, pinned: bool = False, drop: Collection[str] = ()
+) -> dict[str, Any]:
+    """Query a github URL and return the data."""
+    return json.loads(fetch_github(url, pinned=pinned, drop=drop))
+
+
+def parse_uv_lock_file(content: str) -> list[dict[str, Any]]:
+    """Get the list of packages from the contents of a uv lockfile."""
+    data = tomllib.loads(content)
+    return data.get("package", [])
+
+
+def scan_uv_lock_libraries(content: str) -> dict[str, str] | None:
+    """Find library versions in a uv lockfile without parsing the whole file.
+
+    uv writes the name and version of each package on the lines right after its
+    ``[[package]]`` header, so they can be found without building the full TOML
+    document. Packages without a version, such as the editable root package of
+    a project with a dynamic version, are skipped.
+
+    :returns: the version of each library, or ``None`` if the lockfile isn't laid
+        out as expected.
+    """
+    libraries: dict[str, str] = {}
+    packages = 0
+    for match in LOCK_PACKAGE_PATTERN.finditer(content):
+        packages += 1
+        name, version = match.groups()
+        if version is not None and LIBRARY_PATTERN.match(name):
+            libraries[name] = version
+    if packages != len(LOCK_PACKAGE_HEADER_PATTERN.findall(content)):
+        return None
+    return libraries
+
+
+def parse_uv_lock_libraries(content: str) -> dict[str, str]:
+    """Get the version of each library in a uv lockfile.
+
+    If the fast scan can't make sense of the lockfile, it's parsed with tomllib.
+    Packages without a version are skipped.
+    """
+    with _tracer.span("uv.lock", "parse", bytes=len(content)) as details:
+        libraries = scan_uv_lock_libraries(content)
+        if libraries is not None:
+            return libraries
+        logger.debug("Unexpected lockfile layout, parsing it as TOML.")
+        details["toml"] = True
+        return {
+            pkg["name"]: pkg.get("version")
+            for pkg in parse_uv_lock_file(content)
+            if pkg.get("name")
+            and pkg.get("version")
+            and LIBRARY_PATTERN.match(pkg["name"])
+        }
+
+
+def get_uv_lock_file(project: str, ref: str) -> str:
+    """Get the contents of a uv lockfile from a github project.
+
+    The raw media type returns the file as-is rather than base64-encoded in JSON.
+    """
+    url = f"{GITHUB_API}/{project}/contents/uv.lock?ref={ref}"
+    return fetch_github(url, pinned=is_pinned_ref(ref), accept=RAW_MEDIA_TYPE)
+
+
+def count_commits(name: str, total: int, returned: int) -> None:
+    """Warn if fewer commits were retrieved than the compare API reported."""
+    if total > returned:
+        logger.warning(
+            f"There are more commits for {name} than can be retrieved, contributor list may be incomplete.\n"
+            f"total: {total}, returned: {returned}"
+        )
+
+
+def parse_commits(data: list[dict[str, Any]]) -> Iterator[Commit]:
+    """Yield commits from a page of compare API results, skipping filtered authors."""
+    for commit in data:
+        sha = commit["sha"][:7]
+        message = commit["commit"]["message"].splitlines()[0]
+        if commit.get("author") and commit["author"].get("login"):
+            author = commit["author"]["login"]
+        else:
+            author = "unknown"
+        if is_filtered_author(author):
+            continue
+        date = (commit["commit"].get("author") or {}).get("date")
+        yield Commit(sha, message, author, date)
+
+
+def is_filtered_author(author: str) -> bool:
+    """Check if commits by an author should be ignored."""
+    return author in AUTHOR_FILTER or "[bot]" in author
+
+
+def get_commits(
+    name: str, old: str, new: str, linear: set[CommitRange] | None = None
+) -> Iterator[Commit]:
+    """Yield the git commits between two refs.
+
+    The first page of the compare API reports the total number of commits.
+    The remaining pages are fetched ahead in parallel, at most ``PAGE_PREFETCH``
+    at a time, and each page is discarded once its commits have been yielded.
+    Prefetches share the limit of concurrent requests with all other threads.
+    The diffs in each page are dropped as the page streams in.
+
+    :param linear: if given, the range is added to it when the old ref is an
+        ancestor of the new ref.
+    """
+    url = f"{GITHUB_API}/{name}/compare/{old}...{new}?per_page={COMPARE_PAGE_SIZE}"
+    logger.info(f"Getting {name} commits")
+    pinned = is_pinned_ref(old) and is_pinned_ref(new)
+    drop = COMPARE_DROPPED_MEMBERS
+    data = query_github(f"{url}&page=1", pinned=pinned, drop=drop)
+    if linear is not None and data.get("status") in ("ahead", "identical"):
+        linear.add(CommitRange(name, old, new))
+    total = data.get("total_commits", 0)
+    returned = len(data["commits"])
+    yield from parse_commits(data["commits"])
+
+    pages = math.ceil(total / COMPARE_PAGE_SIZE)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=PAGE_PREFETCH) as executor:
+        pending: collections.deque[concurrent.futures.Future[dict[str, Any]]] = (
+            collections.deque()
+        )
+        next_page = 2
+        while next_page <= pages or pending:
+            while next_page <= pages and len(pending) < PAGE_PREFETCH:
+                pending.append(
+                    executor.submit(
+                        query_github,
+                        f"{url}&page={next_page}",
+                        pinned=pinned,
+                        drop=drop,
+                    )
+                )
+                next_page += 1
+            data = pending.popleft().result()
+            if not data["commits"]:
+                # the range is shorter than reported, so later pages are empty too
+                break
+            returned += len(data["commits"])
+            yield from parse_commits(data["commits"])
+        for future in pending:
+            future.cancel()
+
+    count_commits(name, total, returned)
+
+
+# endregion
+# region Github GraphQL API
+
+GRAPHQL_LOCK_FILES_QUERY = """
+query($owner: String!, $name: String!, $old: String!, $new: String!) {
+  repository(owner: $owner, name: $name) {
+    old: object(expression: $old) { ... on Blob { text isTruncated } }
+    new: object(expression: $new) { ... on Blob { text isTruncated } }
+  }
+}
+"""
+"""Query for the old and new lockfiles of a project."""
+
+GRAPHQL_COMPARE_FRAGMENT = """
+  r{index}: repository(owner: $owner, name: $name{index}) {{
+    ref(qualifiedName: $old{index}) {{
+      compare(headRef: $new{index}) {{
+        status
+        commits(first: {page_size}, after: $after{index}) {{
+          pageInfo {{ hasNextPage endCursor }}
+          nodes {{ oid message authoredDate author {{ name user {{ login }} }} }}
+        }}
+      }}
+    }}
+  }}
+"""
+"""Aliased query for one page of commits between two refs of a repo."""
+
+
+def query_graphql(query: str, variables: dict[str, Any]) -> dict[str, Any]:
+    """Send a query to the Github GraphQL API and return the data.
+
+    Errors for individual fields, such as a ref that doesn't exist, are logged
+    and leave that field as ``None`` in the returned data.
+    """
+    headers = {**get_headers(), "Accept": "application/json"}
+    body = json.dumps({"query": query, "variables": variables}).encode("utf-8")
+    logger.debug(f"Querying {GITHUB_GRAPHQL}")
+    with _tracer.span("graphql", "request", url=GITHUB_GRAPHQL) as details:
+        response = trace_request(details, "POST", GITHUB_GRAPHQL, headers, body)
+    result = json.loads(response.body)
+    for error in result.get("errors", []):
+        logger.debug(f"GraphQL error: {error.get('message')}")
+    if result.get("data") is None:
+        raise RuntimeError(f"GraphQL query failed: {result.get('errors')}")
+    return result["data"]
+
+
+def get_uv_lock_files_graphql(
+    project: str, old_ref: str, new_ref: str
+) -> dict[str, str]:
+    """Get the old and new uv lockfiles of a project in one GraphQL request.
+
+    Lockfiles that are too large to be returned inline are fetched over REST.
+    """
+    logger.info(f"Getting {project} lockfiles.")
+    data = query_graphql(
+        GRAPHQL_LOCK_FILES_QUERY,
+        {
+            "owner": OWNER,
+            "name": project,
+            "old": f"{old_ref}:uv.lock",
+            "new": f"{new_ref}:uv.lock",
+        },
+    )
+    lock_files: dict[str, str] = {}
+    for ref, attr in ((old_ref, "old"), (new_ref, "new")):
+        blob = (data.get("repository") or {}).get(attr)
+        if blob and not blob.get("isTruncated"):
+            lock_files[attr] = blob["text"]
+        else:
+            logger.debug(f"Getting {attr} {project} lockfile over REST.")
+            lock_files[attr] = get_uv_lock_file(project, ref)
+    return lock_files
+
+
+def get_commits_graphql(
+    ranges: Sequence[CommitRange], linear: set[CommitRange] | None = None
+) -> dict[CommitRange, list[Commit] | None]:
+    """Get the commits in several ranges.
+
+    Each request holds one page of commits for every range that still has
+    commits left, so the number of requests depends on the longest range rather
+    than the number of ranges.
+
+    :param linear: if given, ranges whose old ref is an ancestor of their new
+        ref are added to it.
+    :returns: the commits in each range, or ``None`` for ranges that couldn't be
+        compared through GraphQL, such as ranges between commit hashes.
+    """
+    found: dict[CommitRange, list[Commit]] = {
+        commit_range: [] for commit_range in ranges
+    }
+    uncompared: set[CommitRange] = set()
+    cursors: dict[CommitRange, str | None] = {
+        commit_range: None for commit_range in ranges
+    }
+    while cursors:
+        logger.info(f"Getting commits for {', '.join(r.name for r in cursors)}")
+        pending = list(cursors)
+        variables: dict[str, Any] = {"owner": OWNER}
+        params = ["$owner: String!"]
+        fragments = []
+        for index, commit_range in enumerate(pending):
+            variables |= {
+                f"name{index}": commit_range.name,
+                f"old{index}": commit_range.old,
+                f"new{index}": commit_range.new,
+                f"after{index}": cursors[commit_range],
+            }
+            params += [
+                f"$name{index}: String!",
+                f"$old{index}: String!",
+                f"$new{index}: String!",
+                f"$after{index}: String",
+            ]
+            fragments.append(
+                GRAPHQL_COMPARE_FRAGMENT.format(
+                    index=index, page_size=GRAPHQL_PAGE_SIZE
+                )
+            )
+        query = f"query({', '.join(params)}) {{{''.join(fragments)}}}"
+        data = query_graphql(query, variables)
+
+        cursors = {}
+        for index, commit_range in enumerate(pending):
+            repository = data.get(f"r{index}") or {}
+            compare = (repository.get("ref") or {}).get("compare")
+            if not compare:
+                logger.debug(f"Couldn't compare {commit_range.name} through GraphQL.")
+                uncompared.add(commit_range)
+                continue
+            if linear is not None and compare.get("status") in ("AHEAD", "IDENTICAL"):
+                linear.add(commit_range)
+            commits = compare["commits"]
+            for node in commits["nodes"]:
+                author_data = node.get("author") or {}
+                name = author_data.get("name") or ""
+                if author_data.get("user"):
+                    author = author_data["user"]["login"]
+                elif is_filtered_author(name):
+                    # bots such as Copilot aren't users, so they have no login
+                    author = name
+                else:
+                    author = "unknown"
+                if is_filtered_author(author):
+                    continue
+                message = node["message"].splitlines()[0]
+                found[commit_range].append(
+                    Commit(node["oid"][:7], message, author, node.get("authoredDate"))
+                )
+            if commits["pageInfo"]["hasNextPage"]:
+                cursors[commit_range] = commits["pageInfo"]["endCursor"]
+    return {
+        commit_range: None if commit_range in uncompared else commits
+        for commit_range, commits in found.items()
+    }
 
-    return parser
 
+# endregion
+# region pull requests
+
+GRAPHQL_PULL_REQUEST_FRAGMENT = """
+    p{number}: pullRequest(number: {number}) {{
+      number title state mergedAt
+      labels(first: 20) {{ nodes {{ name }} }}
+      closingIssuesReferences(first: 10) {{ nodes {{ number }} }}
+    }}
+"""
+"""Aliased query for the details of one PR."""
 
-def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
-    """Parse command line args."""
-    parser = build_parser()
-    args = parser.parse_args(argv)
-    return args
 
+class PullRequestCache:
+    """A persistent cache of merged pull requests.
 
-def set_verbosity(verbose: bool) -> None:
-    """Set the logging level to info or debug."""
-    if verbose:
-        logger.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter("%(message)s"))
-    logger.addHandler(handler)
-    logger.propagate = False
+    Merged PRs don't change, so they're kept without expiry. Open and closed PRs
+    are fetched again on each run.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._pulls: dict[str, dict[str, Any]] = {}
+        self._changed = False
+        try:
+            self._pulls = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.debug(f"Ignoring unreadable PR cache {path}: {e}")
+
+    @staticmethod
+    def _key(repo_name: str, number: int) -> str:
+        return f"{repo_name}#{number}"
+
+    def get(self, repo_name: str, number: int) -> PullRequest | None:
+        """Get a cached PR."""
+        if data := self._pulls.get(self._key(repo_name, number)):
+            return PullRequest(**data)
+        return None
+
+    def put(self, repo_name: str, pull_request: PullRequest) -> None:
+        """Cache a PR, if it's merged."""
+        if pull_request.state == "MERGED":
+            key = self._key(repo_name, pull_request.number)
+            self._pulls[key] = dataclasses.asdict(pull_request)
+            self._changed = True
+
+    def save(self) -> None:
+        """Write the cache to disk, if it changed."""
+        if not self._changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomically(self.path, self._pulls)
+
+
+def get_pull_requests_graphql(
+    pulls: Sequence[tuple[str, int]],
+) -> dict[tuple[str, int], PullRequest]:
+    """Get the details of PRs in batches of ``PULL_REQUEST_BATCH_SIZE`` per request.
+
+    :param pulls: the repo name and number of each PR.
+    :returns: the details of each PR that was found.
+    """
+    found: dict[tuple[str, int], PullRequest] = {}
+    for start in range(0, len(pulls), PULL_REQUEST_BATCH_SIZE):
+        by_repo: dict[str, list[int]] = collections.defaultdict(list)
+        for repo_name, number in pulls[start : start + PULL_REQUEST_BATCH_SIZE]:
+            by_repo[repo_name].append(number)
+
+        variables: dict[str, Any] = {"owner": OWNER}
+        params = ["$owner: String!"]
+        fragments = []
+        for index, (repo_name, numbers) in enumerate(by_repo.items()):
+            variables[f"name{index}"] = repo_name
+            params.append(f"$name{index}: String!")
+            fields = "".join(
+                GRAPHQL_PULL_REQUEST_FRAGMENT.format(number=number)
+                for number in numbers
+            )
+            repository = f"r{index}: repository(owner: $owner, name: $name{index})"
+            fragments.append(f"  {repository} {{{fields}  }}\n")
+        query = f"query({', '.join(params)}) {{\n{''.join(fragments)}}}"
+        data = query_graphql(query, variables)
+
+        for index, (repo_name, numbers) in enumerate(by_repo.items()):
+            repository = data.get(f"r{index}") or {}
+            for number in numbers:
+                node = repository.get(f"p{number}")
+                if not node:
+                    # the number may refer to an issue, or a PR in another repo
+                    logger.debug(f"Couldn't find PR {repo_name}#{number}")
+                    continue
+                found[repo_name, number] = PullRequest(
+                    number=node["number"],
+                    title=node["title"],
+                    state=node["state"],
+                    merged_at=node.get("mergedAt"),
+                    labels=[label["name"] for label in node["labels"]["nodes"]],
+                    issues=[
+                        issue["number"]
+                        for issue in node["closingIssuesReferences"]["nodes"]
+                    ],
+                )
+    return found
+
+
+def enrich_pull_requests(
+    repo_sets: Iterable[dict[str, Repo]], cache: PullRequestCache | None = None
+) -> None:
+    """Get the details of the PR of every commit in the repos.
+
+    PRs are collected across all repos first, so they can be fetched in a few
+    batched requests. Merged PRs are read from and saved to the cache.
+
+    Updates each repo in-place.
+    """
+    repo_sets = list(repo_sets)
+    wanted: set[tuple[str, int]] = set()
+    for repos in repo_sets:
+        for name, repo in repos.items():
+            for commit in repo.commits:
+                if commit.parsed.pr:
+                    wanted.add((name, int(commit.parsed.pr)))
+
+    found: dict[tuple[str, int], PullRequest] = {}
+    missing: list[tuple[str, int]] = []
+    for repo_name, number in sorted(wanted):
+        if cache and (pull_request := cache.get(repo_name, number)):
+            found[repo_name, number] = pull_request
+        else:
+            missing.append((repo_name, number))
+    logger.info(f"Getting {len(missing)} pull requests ({len(found)} cached).")
+    if missing:
+        fetched = get_pull_requests_graphql(missing)
+        found.update(fetched)
+        if cache:
+            for (repo_name, _), pull_request in fetched.items():
+                cache.put(repo_name, pull_request)
+            cache.save()
+
+    for repos in repo_sets:
+        for name, repo in repos.items():
+            repo.pull_requests = {}
+            for commit in repo.commits:
+                if commit.parsed.pr:
+                    number = int(commit.parsed.pr)
+                    if pull_request := found.get((name, number)):
+                        repo.pull_requests[number] = pull_request
 
 
 # endregion
-# region Github API
+# region backends
 
 
-# caching means we only log the warning once
-@functools.lru_cache(maxsize=1)
-def get_token() -> str | None:
-    """Get the github token from the environment."""
-    token = os.getenv("GITHUB_TOKEN")
-    if not token:
-        logger.info("Couldn't find GITHUB_TOKEN in the environment.")
-        logger.info("You'll be rate-limited and restricted to public repos.")
-        logger.info(
-            "To generate a token, go to https://github.com/settings/personal-access-tokens"
-        )
-        logger.info("For public projects, the token doesn't need any permissions.")
-    return token
+class Backend(Protocol):
+    """A source of lockfiles and commits."""
 
+    def get_lock_file(self, project: str, ref: str) -> str:
+        """Get the contents of a project's uv lockfile at a ref."""
+        ...
 
-@functools.lru_cache(maxsize=1)
-def get_headers() -> dict[str, str]:
-    """Get headers for a Github API request."""
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-    }
-    if token := get_token():
-        headers["Authorization"] = f"Bearer {token}"
-    return headers
+    def get_commits(
+        self, name: str, old: str, new: str, linear: set[CommitRange] | None = None
+    ) -> Iterator[Commit]:
+        """Yield the commits between two refs of a repo.
 
+        :param linear: if given, the range is added to it when the old ref is an
+            ancestor of the new ref.
+        """
+        ...
 
-def query_github(url: str) -> dict[str, Any]:
-    """Query a github URL and return the data."""
-    req = Request(url, headers=get_headers())
-    logger.debug(f"Querying {url}")
-    with urlopen(req) as r:
-        return json.load(r)
+    def close(self) -> None:
+        """Release resources and save state at the end of a run."""
+        ...
 
 
-def get_uv_lock_file(project: str, ref: str) -> list[dict[str, Any]]:
-    """Get a uv lockfile from a github project and the list of packages."""
-    url = f"{GITHUB_API}/{project}/contents/uv.lock?ref={ref}"
-    data = query_github(url)
-    content = base64.b64decode(data["content"]).decode("utf-8")
-    data = tomllib.loads(content)
-    return data.get("package", [])
+class GithubBackend:
+    """Get lockfiles and commits from the Github REST API."""
+
+    def get_lock_file(self, project: str, ref: str) -> str:
+        """Get the contents of a project's uv lockfile at a ref."""
+        return get_uv_lock_file(project, ref)
 
+    def get_commits(
+        self, name: str, old: str, new: str, linear: set[CommitRange] | None = None
+    ) -> Iterator[Commit]:
+        """Yield the commits between two refs of a repo."""
+        return get_commits(name, old, new, linear)
 
-def count_commits(name: str, data: dict[str, Any]) -> None:
-    """Warn if there are more commits than can be shown.
+    def close(self) -> None:
+        """Nothing to do, the REST API keeps no state between runs."""
 
-    If you run into this, the fix would be reworking the single API call
-    into a set of API calls that collects commits in batches.
+
+class GitBackend:
+    """Get lockfiles and commits from local bare mirrors of each repo.
+
+    Mirrors are cloned on first use and updated with an incremental ``git fetch``
+    when a ref is missing or may have moved, at most once per run. Refs that look
+    like tags or commit hashes and already exist locally need no network access.
+
+    Git only knows commit emails, so authors are mapped to Github logins through
+    noreply addresses, a persistent email-to-login map, and as a last resort the
+    commits API, unless ``lookup_logins`` is false. Lookups stop for the rest of
+    the run once Github can't be reached. Authors that can't be resolved are
+    "unknown".
     """
-    total = data.get("total_commits", 0)
-    returned = len(data.get("commits", []))
-    if total > returned:
-        logger.warning(
-            f"There are more commits for {name} than can be retrieved, contributor list may be incomplete.\n"
-            f"total: {total}, returned: {returned}"
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        url_template: str = GIT_URL,
+        lookup_logins: bool = True,
+    ) -> None:
+        self.directory = directory / "mirrors"
+        self.url_template = url_template
+        self.lookup_logins = lookup_logins
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._logins_path = self.directory / "logins.json"
+        try:
+            self._logins: dict[str, str | None] = json.loads(
+                self._logins_path.read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            self._logins = {}
+        self._logins_changed = False
+        self._unresolved: set[str] = set()
+        self._fetched: set[str] = set()
+        self._locks: dict[str, threading.Lock] = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def _git(self, name: str, *args: str) -> str:
+        """Run a git command in the mirror of a repo and return its output.
+
+        :raises RuntimeError: if the command fails.
+        """
+        try:
+            result = subprocess.run(
+                ["git", "-C", str(self.directory / f"{name}.git"), *args],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(
+                f"'git {args[0]}' failed for {name}: {e.stderr.strip()}"
+            ) from e
+        return result.stdout
+
+    def _has_ref(self, name: str, ref: str) -> bool:
+        try:
+            self._git(name, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+        except RuntimeError:
+            return False
+        return True
+
+    def update(self, name: str, *refs: str) -> None:
+        """Clone or fetch the mirror of a repo so that it has up-to-date refs.
+
+        :raises RuntimeError: if git fails to clone or fetch.
+        """
+        with self._lock:
+            lock = self._locks[name]
+        with lock:
+            path = self.directory / f"{name}.git"
+            url = self.url_template.format(owner=OWNER, name=name)
+            if not path.exists():
+                logger.info(f"Cloning {url}")
+                try:
+                    subprocess.run(
+                        ["git", "clone", "--bare", "--quiet", url, str(path)],
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    )
+                except subprocess.CalledProcessError as e:
+                    raise RuntimeError(
+                        f"'git clone' failed for {name}: {e.stderr.strip()}"
+                    ) from e
+                self._fetched.add(name)
+            if name in self._fetched:
+                return
+            if all(is_pinned_ref(ref) and self._has_ref(name, ref) for ref in refs):
+                return
+            logger.info(f"Fetching {url}")
+            self._git(
+                name,
+                "fetch",
+                "--quiet",
+                "--prune",
+                url,
+                "+refs/heads/*:refs/heads/*",
+                "+refs/tags/*:refs/tags/*",
+            )
+            self._fetched.add(name)
+
+    def get_lock_file(self, project: str, ref: str) -> str:
+        """Get the contents of a project's uv lockfile at a ref."""
+        self.update(project, ref)
+        return self._git(project, "show", f"{ref}:uv.lock")
+
+    def get_commits(
+        self, name: str, old: str, new: str, linear: set[CommitRange] | None = None
+    ) -> Iterator[Commit]:
+        """Yield the commits between two refs of a repo, oldest first."""
+        logger.info(f"Getting {name} commits")
+        self.update(name, old, new)
+        if linear is not None:
+            try:
+                self._git(name, "merge-base", "--is-ancestor", old, new)
+            except RuntimeError:
+                pass
+            else:
+                linear.add(CommitRange(name, old, new))
+        log = self._git(
+            name,
+            "log",
+            "--reverse",
+            "--format=%H%x1f%aI%x1f%ae%x1f%an%x1f%B%x1e",
+            f"{old}..{new}",
         )
+        for record in log.split("\x1e"):
+            if not record.strip():
+                continue
+            sha, date, email, author_name, message = record.strip("\n").split("\x1f", 4)
+            if "[bot]" in author_name:
+                author = author_name
+            else:
+                author = self.get_login(name, sha, email)
+            if is_filtered_author(author):
+                continue
+            header = message.splitlines()[0] if message else ""
+            yield Commit(sha[:7], header, author, date)
+
+    def get_login(self, name: str, sha: str, email: str) -> str:
+        """Get the Github login of a commit author."""
+        if match := NOREPLY_EMAIL_PATTERN.match(email):
+            return match.group(1)
+        with self._lock:
+            if email in self._logins:
+                return self._logins[email] or "unknown"
+            if email in self._unresolved or not self.lookup_logins:
+                return "unknown"
+        try:
+            data = query_github(f"{GITHUB_API}/{name}/commits/{sha}", pinned=True)
+        except (OSError, http.client.HTTPException, RuntimeError) as e:
+            # don't save the failure, the lookup may work on the next run
+            logger.debug(f"Couldn't look up the login for {email}: {e}")
+            with self._lock:
+                self._unresolved.add(email)
+                if not isinstance(e, HTTPError) and self.lookup_logins:
+                    # Github is unreachable or rate limited, so don't wait on it again
+                    logger.info(f"Skipping login lookups for the rest of the run: {e}")
+                    self.lookup_logins = False
+            return "unknown"
+        login = (data.get("author") or {}).get("login")
+        with self._lock:
+            self._logins[email] = login
+            self._logins_changed = True
+        return login or "unknown"
+
+    def close(self) -> None:
+        """Save the email-to-login map."""
+        if not self._logins_changed:
+            return
+        write_atomically(self._logins_path, self._logins, indent=2, sort_keys=True)
+
+
+_backend: Backend = GithubBackend()
+
+
+def set_backend(backend: Backend) -> None:
+    """Set where lockfiles and commits are read from."""
+    global _backend
+    _backend = backend
 
 
-def get_commits(name: str, old: str, new: str) -> list[Commit]:
-    """Returns a list of git commits."""
-    url = f"{GITHUB_API}/{name}/compare/{old}...{new}"
-    logger.info(f"Getting {name} commits")
-    data = query_github(url)
-    count_commits(name, data)
+# endregion
+# region commit index
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    header TEXT NOT NULL,
+    author TEXT NOT NULL,
+    pr INTEGER,
+    date TEXT,
+    PRIMARY KEY (repo, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_author ON commits (author);
+CREATE INDEX IF NOT EXISTS commits_date ON commits (date);
+
+CREATE TABLE IF NOT EXISTS ranges (
+    repo TEXT NOT NULL,
+    old TEXT NOT NULL,
+    new TEXT NOT NULL,
+    linear INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (repo, old, new)
+);
+
+CREATE TABLE IF NOT EXISTS range_commits (
+    repo TEXT NOT NULL,
+    old TEXT NOT NULL,
+    new TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    sha TEXT NOT NULL,
+    PRIMARY KEY (repo, old, new, position)
+);
+CREATE INDEX IF NOT EXISTS range_commits_sha ON range_commits (repo, sha);
+
+CREATE TABLE IF NOT EXISTS lock_refs (
+    project TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    PRIMARY KEY (project, ref)
+);
+
+CREATE TABLE IF NOT EXISTS lock_versions (
+    project TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    library TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (project, ref, library)
+);
+"""
+"""Schema of the commit index."""
 
-    commits: list[Commit] = []
-    for commit in data["commits"]:
-        sha = commit["sha"][:7]
-        message = commit["commit"]["message"].splitlines()[0]
-        if commit.get("author") and commit["author"].get("login"):
-            author = commit["author"]["login"]
-        else:
-            author = "unknown"
-        if author in AUTHOR_FILTER or "[bot]" in author:
-            continue
-        commits.append(Commit(sha, message, author))
-    return commits
+
+class CommitIndex:
+    """A local SQLite index of commits and lockfile library versions.
+
+    Commits are recorded per repo along with the ranges they belong to, and
+    library versions per project lockfile. Only ranges and lockfiles for pinned
+    refs are answered from the index, since branches can move.
+
+    A range is ``linear`` when its old ref is an ancestor of its new ref, so it
+    holds the commits reachable from the new ref but not the old one. Linear
+    ranges form a graph of refs, and any range between two refs connected in
+    that graph can be answered from it, not only the recorded ones. Following a
+    range forwards adds its commits and following it backwards removes them, so
+    2.1..2.6 is 2.1..2.3 followed by 2.3..2.6, and 2.3..2.6 is 2.1..2.6 without
+    2.1..2.3.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(INDEX_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_range(self, commit_range: CommitRange) -> list[Commit] | None:
+        """Get the commits in a range, or ``None`` if it isn't indexed.
+
+        The commits are in the order of the recorded ranges they come from.
+        """
+        if not (is_pinned_ref(commit_range.old) and is_pinned_ref(commit_range.new)):
+            return None
+        name, old, new = commit_range.name, commit_range.old, commit_range.new
+        with self._lock:
+            if self._db.execute(
+                "SELECT 1 FROM ranges WHERE repo = ? AND old = ? AND new = ?",
+                (name, old, new),
+            ).fetchone():
+                return self._get_commits(name, old, new)
+            edges = self._db.execute(
+                "SELECT old, new FROM ranges WHERE repo = ? AND linear", (name,)
+            ).fetchall()
+            if (path := find_ref_path(edges, old, new)) is None:
+                return None
+            counts: collections.Counter[str] = collections.Counter()
+            commits: dict[str, Commit] = {}
+            for edge_old, edge_new, sign in path:
+                for commit in self._get_commits(name, edge_old, edge_new):
+                    counts[commit.hash] += sign
+                    if sign > 0:
+                        commits.setdefault(commit.hash, commit)
+        logger.debug(f"Answering {name} {old}..{new} from {len(path)} indexed ranges")
+        return [commit for sha, commit in commits.items() if counts[sha] > 0]
+
+    def _get_commits(self, name: str, old: str, new: str) -> list[Commit]:
+        """Get the commits of a recorded range."""
+        rows = self._db.execute(
+            "SELECT c.sha, c.header, c.author, c.date FROM range_commits r "
+            "JOIN commits c ON c.repo = r.repo AND c.sha = r.sha "
+            "WHERE r.repo = ? AND r.old = ? AND r.new = ? ORDER BY r.position",
+            (name, old, new),
+        ).fetchall()
+        return [Commit(*row) for row in rows]
+
+    def put_range(
+        self, commit_range: CommitRange, commits: list[Commit], linear: bool = False
+    ) -> None:
+        """Record the commits in a range.
+
+        :param linear: whether the old ref is an ancestor of the new ref.
+        """
+        key = (commit_range.name, commit_range.old, commit_range.new)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        commit_range.name,
+                        commit.hash,
+                        commit.header,
+                        commit.author,
+                        get_pr_number(commit),
+                        commit.date,
+                    )
+                    for commit in commits
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM range_commits WHERE repo = ? AND old = ? AND new = ?", key
+            )
+            self._db.executemany(
+                "INSERT INTO range_commits VALUES (?, ?, ?, ?, ?)",
+                (
+                    (*key, position, commit.hash)
+                    for position, commit in enumerate(commits)
+                ),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO ranges VALUES (?, ?, ?, ?)", (*key, linear)
+            )
+
+    def get_libraries(self, project: str, ref: str) -> dict[str, str] | None:
+        """Get the library versions in a project's lockfile, if it's indexed."""
+        if not is_pinned_ref(ref):
+            return None
+        with self._lock:
+            if not self._db.execute(
+                "SELECT 1 FROM lock_refs WHERE project = ? AND ref = ?", (project, ref)
+            ).fetchone():
+                return None
+            rows = self._db.execute(
+                "SELECT library, version FROM lock_versions "
+                "WHERE project = ? AND ref = ? ORDER BY rowid",
+                (project, ref),
+            ).fetchall()
+        return dict(rows)
+
+    def put_libraries(self, project: str, ref: str, libraries: dict[str, str]) -> None:
+        """Record the library versions in a project's lockfile."""
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM lock_versions WHERE project = ? AND ref = ?",
+                (project, ref),
+            )
+            self._db.executemany(
+                "INSERT INTO lock_versions VALUES (?, ?, ?, ?)",
+                (
+                    (project, ref, name, version)
+                    for name, version in libraries.items()
+                    if version is not None
+                ),
+            )
+            self._db.execute(
+                "INSERT OR IGNORE INTO lock_refs VALUES (?, ?)", (project, ref)
+            )
+
+    def contributors_per_quarter(self) -> list[tuple[str, int, list[str]]]:
+        """Get the commits and contributors of each quarter, across all repos."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT substr(date, 1, 4) || '-Q' "
+                "|| ((CAST(substr(date, 6, 2) AS INTEGER) + 2) / 3) AS quarter, "
+                "COUNT(*), GROUP_CONCAT(DISTINCT author) "
+                "FROM commits WHERE date IS NOT NULL GROUP BY quarter ORDER BY quarter"
+            ).fetchall()
+        return [
+            (quarter, count, sorted(authors.split(","), key=str.lower))
+            for quarter, count, authors in rows
+        ]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+def find_ref_path(
+    edges: Iterable[tuple[str, str]], start: str, end: str
+) -> list[tuple[str, str, int]] | None:
+    """Find the shortest path between two refs through a graph of ranges.
+
+    :param edges: the old and new ref of each range.
+    :returns: the old and new ref of each range on the path, with ``1`` if it's
+        followed forwards or ``-1`` if it's followed backwards, or ``None`` if
+        the refs aren't connected.
+    """
+    graph: dict[str, list[tuple[str, tuple[str, str, int]]]] = {}
+    for old, new in edges:
+        graph.setdefault(old, []).append((new, (old, new, 1)))
+        graph.setdefault(new, []).append((old, (old, new, -1)))
+    previous: dict[str, tuple[str, tuple[str, str, int]] | None] = {start: None}
+    queue = collections.deque([start])
+    while queue and end not in previous:
+        ref = queue.popleft()
+        for neighbour, edge in graph.get(ref, ()):
+            if neighbour not in previous:
+                previous[neighbour] = (ref, edge)
+                queue.append(neighbour)
+    if end not in previous:
+        return None
+    path = []
+    ref = end
+    while step := previous[ref]:
+        ref, edge = step
+        path.append(edge)
+    return path[::-1]
+
+
+_index: CommitIndex | None = None
+
+
+def set_index(index: CommitIndex | None) -> None:
+    """Enable or disable the commit index."""
+    global _index
+    _index = index
+
+
+def log_index_stats(index: CommitIndex) -> None:
+    """Log the contributors per quarter recorded in the index."""
+    for quarter, count, authors in index.contributors_per_quarter():
+        logger.info(f"{quarter}: {count} commits by {len(authors)} contributors")
+        logger.info(textwrap.indent(textwrap.fill(", ".join(authors)), "  "))
 
 
 # endregion
@@ -285,17 +2739,36 @@ def log_commits(repos: dict[str, Repo]) -> None:
             logger.info("  no changes")
 
 
-def log_contributors(repos: dict[str, Repo]) -> None:
-    """Log a list of unique authors, formatted for an rst release note page."""
+def log_contributors(stats: ContributorStats) -> None:
+    """Log a list of unique authors, formatted for an rst release note page.
+
+    This is followed by the contributions of each author and to each repo.
+    """
     logger.info("\nContributor list:")
-    contributors = get_contributors(repos)
+    contributors = stats.rst
+    last = len(contributors) - 1
     for i, contributor in enumerate(contributors):
-        is_last = i == len(contributors) - 1
-        if is_last:
+        if i == last:
             logger.info(f"and {contributor}")
         else:
             logger.info(f"{contributor},")
 
+    if stats.authors:
+        logger.info("\nContributions:")
+    for author in stats.by_commits:
+        repos = ", ".join(
+            f"{name} {count}" for name, count in author.repos.most_common()
+        )
+        logger.info(
+            f"  {author.login}: {author.commits} commits, "
+            f"{len(author.pull_requests)} PRs ({repos})"
+        )
+
+    if stats.repos:
+        logger.info("\nCommits per repo:")
+    for name, repo in stats.repos.items():
+        logger.info(f"  {name}: {repo.commits} commits by {len(repo.authors)} authors")
+
 
 # endregion
 # region html page
@@ -407,28 +2880,192 @@ HTML_TEMPLATE = textwrap.dedent(
     .toggle-buttons button:hover {
         background-color: #555;
     }
+
+    /* PR labels */
+    .label {
+        font-size: 0.85em;
+        color: #ccc;
+        border: 1px solid #777;
+        border-radius: 8px;
+        padding: 0 5px;
+    }
+
+    /* collapsed repo sections of lazy reports */
+    details.repo > summary {
+        cursor: pointer;
+        margin-top: 1em;
+    }
+    details.repo > summary h2 {
+        display: inline;
+    }
+
+    /* only the rows scrolled into view are rendered, so rows must keep one height */
+    .lazy-scroll {
+        max-height: 80vh;
+        overflow-y: auto;
+        width: fit-content;
+    }
+    .lazy-scroll td {
+        white-space: nowrap;
+    }
+    .lazy-scroll thead th {
+        position: sticky;
+        top: 0;
+    }
     </style>
     <script>
     function sortTable(th, col, type) {
       const table = th.closest('table');
-      const tbody = table.tBodies[0];
-      const rows = Array.from(tbody.rows);
 
       // toggle direction per column
       const dir = (th.dataset.dir = (th.dataset.dir === 'asc' ? 'desc' : 'asc')) === 'asc' ? 1 : -1;
 
-      const getKey = (tr) => {
-        const cell = tr.cells[col];
-        if (!cell) return '';
-        const text = cell.textContent.trim();
+      const toKey = (text) => {
+        text = text.trim();
         if (type === 'num') return parseFloat(text.replace(/[^0-9.\\-]/g, '')) || 0;
         return text.toLowerCase();
       };
+      const compare = (a, b) => (a > b ? 1 : a < b ? -1 : 0) * dir;
+
+      // keys are computed once per row and column, and kept for later sorts
+      if (table.classList.contains('lazy-commit-table')) {
+        const lazy = getLazyTable(table);
+        lazy.rows.forEach((row) => {
+          if (!(col in row.keys)) row.keys[col] = toKey(getLazySortText(row, col));
+        });
+        lazy.rows.sort((a, b) => compare(a.keys[col], b.keys[col]));
+        renderLazyTable(lazy, true);
+        return;
+      }
+
+      const tbody = table.tBodies[0];
+      const keyed = Array.from(tbody.rows, (tr) => {
+        tr.sortKeys = tr.sortKeys || {};
+        if (!(col in tr.sortKeys)) {
+          // cells can carry a sort key, such as a zero-padded PR number
+          const cell = tr.cells[col];
+          tr.sortKeys[col] = cell ? toKey(cell.dataset.key ?? cell.textContent) : '';
+        }
+        return [tr.sortKeys[col], tr];
+      });
+
+      keyed.sort((a, b) => compare(a[0], b[0]));
+
+      // reattach in new order, in a single DOM update
+      const fragment = document.createDocumentFragment();
+      keyed.forEach(([, tr]) => fragment.appendChild(tr));
+      tbody.appendChild(fragment);
+    }
+
+    // rows rendered above and below the ones in view of a lazy table
+    const LAZY_OVERSCAN = 20;
+
+    function getLazyTable(table) {
+      // the commits are only parsed the first time they're needed
+      if (!table.lazy) {
+        const script = document.getElementById(table.dataset.commits);
+        const data = JSON.parse(script.textContent);
+        const lazy = {
+          table: table,
+          scroller: table.parentElement,
+          tbody: table.tBodies[0],
+          rows: data.map(([hash, header, author, pr, type, labels, description]) => (
+            {hash, header, author, pr, type, labels, description, done: false, keys: {}}
+          )),
+          types: {},
+          rowHeight: 24,
+          first: -1,
+          last: -1,
+        };
+        lazy.rows.forEach((row) => {
+          if (row.type) (lazy.types[row.type] ||= []).push(row);
+        });
+        lazy.scroller.addEventListener('scroll', () => renderLazyTable(lazy, false));
+        table.lazy = lazy;
+      }
+      return table.lazy;
+    }
+
+    function getLazySortText(row, col) {
+      const pr = row.pr ? row.pr.padStart(10, '0') : '';
+      return ['', row.header, pr, row.author, row.hash][col];
+    }
+
+    function openLazyTable(details) {
+      if (!details.open) return;
+      const table = details.querySelector('table.lazy-commit-table');
+      if (table) renderLazyTable(getLazyTable(table), true);
+    }
+
+    function renderLazyRow(lazy, row) {
+      const tr = document.createElement('tr');
+      tr.classList.toggle('done', row.done);
+      const check = document.createElement('td');
+      check.onclick = (event) => toggleCheckbox(event, check);
+      const checkbox = document.createElement('input');
+      checkbox.type = 'checkbox';
+      checkbox.checked = row.done;
+      checkbox.onchange = () => {
+        row.done = checkbox.checked;
+        tr.classList.toggle('done', row.done);
+      };
+      check.appendChild(checkbox);
+      tr.appendChild(check);
+
+      const cells = [row.header, null, row.author, row.hash];
+      cells.forEach((text) => {
+        const td = document.createElement('td');
+        if (text !== null) {
+          td.textContent = text;
+        } else if (row.pr) {
+          const link = document.createElement('a');
+          link.href = lazy.table.dataset.prUrl + row.pr;
+          link.target = '_blank';
+          link.textContent = '#' + row.pr;
+          if (row.description) link.title = row.description;
+          td.appendChild(link);
+          (row.labels || []).forEach((name) => {
+            const label = document.createElement('span');
+            label.className = 'label';
+            label.textContent = name;
+            td.append(' ', label);
+          });
+        } else {
+          td.textContent = 'n/a';
+        }
+        tr.appendChild(td);
+      });
+      return tr;
+    }
 
-      rows.sort((a,b) => (getKey(a) > getKey(b) ? 1 : getKey(a) < getKey(b) ? -1 : 0) * dir);
+    function renderLazySpacer(height) {
+      const tr = document.createElement('tr');
+      tr.style.height = height + 'px';
+      return tr;
+    }
 
-      // reattach in new order
-      rows.forEach(r => tbody.appendChild(r));
+    function renderLazyTable(lazy, force) {
+      // render the rows in view, with spacer rows in place of the others
+      const view = Math.max(lazy.scroller.clientHeight, window.innerHeight);
+      const top = Math.floor(lazy.scroller.scrollTop / lazy.rowHeight);
+      const first = Math.max(0, top - LAZY_OVERSCAN);
+      const visible = Math.ceil(view / lazy.rowHeight);
+      const last = Math.min(lazy.rows.length, first + visible + 2 * LAZY_OVERSCAN);
+      if (!force && first === lazy.first && last === lazy.last) return;
+      lazy.first = first;
+      lazy.last = last;
+      lazy.tbody.replaceChildren(
+        renderLazySpacer(first * lazy.rowHeight),
+        ...lazy.rows.slice(first, last).map((row) => renderLazyRow(lazy, row)),
+        renderLazySpacer((lazy.rows.length - last) * lazy.rowHeight),
+      );
+      // measure the real height of a row once, then render again with it
+      const row = lazy.tbody.rows[1];
+      const height = row ? row.offsetHeight : 0;
+      if (last > first && height && height !== lazy.rowHeight) {
+        lazy.rowHeight = row.offsetHeight;
+        renderLazyTable(lazy, true);
+      }
     }
 
     function toggleCheckbox(event, cell) {
@@ -440,27 +3077,39 @@ HTML_TEMPLATE = textwrap.dedent(
       checkbox.dispatchEvent(new Event('change'));
     }
 
+    // checkboxes of rows in regular tables by commit type, indexed on first use
+    let commitTypeIndex = null;
+
     function toggleCommitType(commitType) {
-      // matches conventional-commit headers like 'type:' or 'type(scope):'
-      const escapedType = commitType.replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&');
-      const regex = new RegExp('^' + escapedType + '(\\(.*\\))?!?:', 'i');
-      const matches = [];
-      document.querySelectorAll('table.commit-table tbody tr').forEach((tr) => {
-        const headerCell = tr.cells[1];
-        const checkbox = tr.cells[0] && tr.cells[0].querySelector('input[type="checkbox"]');
-        if (!headerCell || !checkbox) return;
-        if (regex.test(headerCell.textContent.trim())) {
-          matches.push(checkbox);
-        }
-      });
+      if (!commitTypeIndex) {
+        commitTypeIndex = {};
+        const selector = 'table.commit-table tbody tr[data-type]';
+        const rows = document.querySelectorAll(selector);
+        rows.forEach((tr) => {
+          const checkbox = tr.cells[0].querySelector('input[type="checkbox"]');
+          if (checkbox) (commitTypeIndex[tr.dataset.type] ||= []).push(checkbox);
+        });
+      }
+      const matches = commitTypeIndex[commitType] || [];
+      // rows of lazy tables are indexed in their data, whether they're rendered or not
+      const lazyTables = Array.from(
+        document.querySelectorAll('table.lazy-commit-table'), getLazyTable
+      );
+      const lazyMatches = lazyTables.flatMap((lazy) => lazy.types[commitType] || []);
       // if every match is already checked, uncheck them all; otherwise check them all
-      const nextChecked = !matches.every((checkbox) => checkbox.checked);
+      const allChecked = matches.every((checkbox) => checkbox.checked)
+        && lazyMatches.every((row) => row.done);
+      const nextChecked = !allChecked;
       matches.forEach((checkbox) => {
         if (checkbox.checked !== nextChecked) {
           checkbox.checked = nextChecked;
           checkbox.dispatchEvent(new Event('change'));
         }
       });
+      lazyMatches.forEach((row) => { row.done = nextChecked; });
+      lazyTables.forEach((lazy) => {
+        if (lazy.table.closest('details').open) renderLazyTable(lazy, true);
+      });
     }
     </script>
 
@@ -491,70 +3140,149 @@ def hyperlink_project(repo_name: str) -> str:
     return f"<a href='{html.escape(url)}' target='_blank'>{escaped}</a>"
 
 
-def hyperlink_commit(repo_name: str, commit: Commit) -> str:
-    """Add an inline link to the PR."""
-    match = PR_PATTERN.match(commit.header)
-    if match:
-        pr_number = match.group(1)
-        pr_link = f"https://github.com/canonical/{repo_name}/pull/{pr_number}"
-        return f"<a href='{html.escape(pr_link)}' target='_blank'>#{html.escape(pr_number)}</a>"
-    return html.escape("n/a")
+def hyperlink_commit_hash(repo_name: str, commit_hash: str) -> str:
+    """Return a hyperlink to a commit, showing its abbreviated hash."""
+    url = f"https://github.com/{OWNER}/{repo_name}/commit/{commit_hash}"
+    escaped = html.escape(commit_hash[:7])
+    return f"<a href='{html.escape(url)}' target='_blank'>{escaped}</a>"
+
+
+def get_pr_number(commit: Commit) -> str | None:
+    """Get the number of the PR that a commit came from."""
+    return commit.parsed.pr
+
+
+def describe_pull_request(pull_request: PullRequest) -> str:
+    """Describe a PR in plain text, with its title, merge date and closed issues."""
+    lines = [pull_request.title]
+    if pull_request.merged_at:
+        lines.append(f"merged {pull_request.merged_at[:10]}")
+    else:
+        lines.append(pull_request.state.lower())
+    if pull_request.issues:
+        lines.append(
+            "closes " + ", ".join(f"#{issue}" for issue in pull_request.issues)
+        )
+    return "\n".join(lines)
+
 
+def hyperlink_commit(
+    repo_name: str, commit: Commit, pull_request: PullRequest | None = None
+) -> str:
+    """Add an inline link to the PR.
+
+    With the details of the PR, the link has a tooltip that describes the PR,
+    and is followed by the PR's labels.
+    """
+    if not (pr_number := get_pr_number(commit)):
+        return html.escape("n/a")
+    pr_link = f"https://github.com/canonical/{repo_name}/pull/{pr_number}"
+    title = labels = ""
+    if pull_request:
+        title = f" title='{html.escape(describe_pull_request(pull_request))}'"
+        labels = "".join(
+            f" <span class='label'>{html.escape(label)}</span>"
+            for label in pull_request.labels
+        )
+    return (
+        f"<a href='{html.escape(pr_link)}' target='_blank'{title}>"
+        f"#{html.escape(pr_number)}</a>{labels}"
+    )
 
-def generate_versions_table(repos: dict[str, Repo]) -> str:
-    """Generate a table of version changes."""
-    rows = []
 
-    header = textwrap.dedent(
+def generate_versions_table(
+    repos: dict[str, Repo], stats: ContributorStats
+) -> Iterator[str]:
+    """Generate a table of version changes, with the commits and authors of each."""
+    yield "<table>"
+    yield textwrap.dedent(
         """<thead>
              <tr>
                <th>project</th>
                <th>old</th>
                <th>new</th>
+               <th>commits</th>
+               <th>authors</th>
              </tr>
            </thead>
            """
     )
-    rows.append(header)
-
-    body_rows = []
+    yield "<tbody>\n"
     for name, data in repos.items():
-        row_html = (
+        repo_stats = stats.repos.get(name) or RepoStats()
+        yield (
             "<tr>"
             f"<td>{html.escape(name)}</td>"
             f"<td>{html.escape(data.old or 'n/a')}</td>"
             f"<td>{html.escape(data.new or 'n/a')}</td>"
-            "</tr>"
+            f"<td>{repo_stats.commits}</td>"
+            f"<td>{len(repo_stats.authors)}</td>"
+            "</tr>\n"
         )
-        body_rows.append(row_html)
-
-    body = "<tbody>\n" + "\n".join(body_rows) + "\n</tbody>"
-    rows.append(body)
+    yield "</tbody></table>"
 
-    return "<table>" + "\n".join(rows) + "</table>"
 
+def generate_contributors_html(stats: ContributorStats) -> Iterator[str]:
+    """Generate a <pre> block of contributors, to be copied into an rst file.
 
-def generate_contributors_html(repos: dict[str, Repo]) -> str | None:
-    """Generate a <pre> block of contributors, to be copied into an rst file."""
-    if contributors := get_contributors(repos):
-        row = "<h2>Contributors</h2>"
-        row += "<pre>\n"
+    This is followed by a table of the contributions of each author.
+    """
+    if contributors := stats.rst:
+        yield "<h2>Contributors</h2>"
+        yield "<pre>\n"
+        last = len(contributors) - 1
         for i, contributor in enumerate(contributors):
-            is_last = i == len(contributors) - 1
-            if is_last:
-                row += f"and {html.escape(contributor)}"
+            if i == last:
+                yield f"and {html.escape(contributor)}"
             else:
-                row += f"{html.escape(contributor)},\n"
-        row += "</pre>\n"
-        return row
-    return None
+                yield f"{html.escape(contributor)},\n"
+        yield "</pre>\n"
+        yield from generate_contributions_table(stats)
 
 
-def generate_commit_table(repo_name: str, commits: list[Commit]) -> str:
-    """Generate a table of commits."""
-    rows = []
+def generate_contributions_table(stats: ContributorStats) -> Iterator[str]:
+    """Generate a table of the contributions of each author, most commits first."""
+    yield "<table>"
+    yield textwrap.dedent(
+        """<thead>
+             <tr>
+               <th>author</th>
+               <th>commits</th>
+               <th>PRs</th>
+               <th>repos</th>
+               <th>first commit</th>
+               <th>last commit</th>
+             </tr>
+           </thead>
+           """
+    )
+    yield "<tbody>\n"
+    for author in stats.by_commits:
+        repos = ", ".join(
+            f"{html.escape(name)} ({count})"
+            for name, count in author.repos.most_common()
+        )
+        commits = []
+        for repo_name, commit in (author.first, author.last):
+            date = html.escape((commit.date or "")[:10])
+            link = hyperlink_commit_hash(repo_name, commit.hash)
+            commits.append(f"{date} {link}" if date else link)
+        yield (
+            "<tr>"
+            f"<td>{html.escape(author.login)}</td>"
+            f"<td>{author.commits}</td>"
+            f"<td>{len(author.pull_requests)}</td>"
+            f"<td>{repos}</td>"
+            f"<td>{commits[0]}</td>"
+            f"<td>{commits[1]}</td>"
+            "</tr>\n"
+        )
+    yield "</tbody></table>"
+
 
-    header = textwrap.dedent(
+def generate_commit_table_head() -> Iterator[str]:
+    """Generate the head of a table of commits, with sortable columns."""
+    yield textwrap.dedent(
         """<thead>
              <tr>
              <th>check</th>
@@ -566,137 +3294,798 @@ def generate_commit_table(repo_name: str, commits: list[Commit]) -> str:
            </thead>
            """
     )
-    rows.append(header)
 
-    body_rows = []
+
+def get_row_attributes(commit: Commit) -> str:
+    """Get the data attributes of a commit's row, for the page's scripts."""
+    parsed = commit.parsed
+    attributes = ""
+    if parsed.type:
+        attributes += f" data-type='{html.escape(parsed.type)}'"
+    if parsed.scope:
+        attributes += f" data-scope='{html.escape(parsed.scope)}'"
+    if parsed.breaking:
+        attributes += " data-breaking='true'"
+    return attributes
+
+
+def get_pr_sort_key(pr_number: str | None) -> str:
+    """Get a key that sorts PR numbers numerically as text."""
+    return pr_number.zfill(10) if pr_number else ""
+
+
+def generate_commit_table(
+    repo_name: str,
+    commits: Iterable[Commit],
+    pull_requests: dict[int, PullRequest] | None = None,
+) -> Iterator[str]:
+    """Generate a table of commits, one row at a time.
+
+    Each row carries the parsed parts of its header as data attributes, so the
+    page can sort and toggle rows without parsing their text.
+    """
+    yield "<table class='commit-table'>"
+    yield from generate_commit_table_head()
+    yield "<tbody>\n"
+    pull_requests = pull_requests or {}
     for commit in commits:
-        row_html = (
-            "<tr>"
+        pr_key = get_pr_sort_key(commit.parsed.pr)
+        pull_request = pull_requests.get(int(commit.parsed.pr or 0))
+        pr_cell = hyperlink_commit(repo_name, commit, pull_request)
+        yield (
+            f"<tr{get_row_attributes(commit)}>"
             "<td onclick='toggleCheckbox(event, this)'>"
             "<input type='checkbox' "
             "onchange='this.closest(\"tr\").classList.toggle(\"done\", this.checked)'>"
             "</td>"
             f"<td>{html.escape(commit.header)}</td>"
-            f"<td>{hyperlink_commit(repo_name, commit)}</td>"
+            f"<td data-key='{pr_key}'>{pr_cell}</td>"
             f"<td>{html.escape(commit.author)}</td>"
             f"<td>{html.escape(commit.hash)}</td>"
-            "</tr>"
+            "</tr>\n"
         )
-        body_rows.append(row_html)
+    yield "</tbody></table>"
 
-    body = "<tbody>\n" + "\n".join(body_rows) + "\n</tbody>"
-    rows.append(body)
 
-    return "<table class='commit-table'>" + "\n".join(rows) + "</table>"
+def generate_lazy_commit_table(
+    repo_name: str,
+    commits: Iterable[Commit],
+    pull_requests: dict[int, PullRequest] | None = None,
+) -> Iterator[str]:
+    """Generate an empty table of commits, with the commits embedded as JSON.
 
-
-def generate_toggle_buttons_html() -> str:
-    """Generate a section of buttons to bulk-toggle commits by type."""
-    row = "<h2>Toggle commits</h2>\n<div class='toggle-buttons'>\n"
+    The page renders the rows when the table's section is opened, and only
+    keeps the rows that are scrolled into view in the DOM.
+    """
+    escaped = html.escape(repo_name)
+    pr_url = html.escape(f"https://github.com/{OWNER}/{repo_name}/pull/")
+    yield "<div class='lazy-scroll'>"
+    yield (
+        f"<table class='commit-table lazy-commit-table' "
+        f"data-commits='commits-{escaped}' data-pr-url='{pr_url}'>"
+    )
+    yield from generate_commit_table_head()
+    yield "<tbody></tbody></table></div>\n"
+    yield f"<script type='application/json' id='commits-{escaped}'>[\n"
+    separator = ""
+    pull_requests = pull_requests or {}
+    for commit in commits:
+        parsed = commit.parsed
+        row: list[Any] = [
+            commit.hash,
+            commit.header,
+            commit.author,
+            parsed.pr,
+            parsed.type,
+        ]
+        if pull_request := pull_requests.get(int(parsed.pr or 0)):
+            row += [pull_request.labels, describe_pull_request(pull_request)]
+        # "<" is escaped so that a commit header can't close the script element
+        yield separator + json.dumps(row).replace("<", "\\u003c")
+        separator = ",\n"
+    yield "\n]</script>\n"
+
+
+def generate_toggle_buttons_html(repos: dict[str, Repo]) -> Iterator[str]:
+    """Generate a section of buttons to bulk-toggle commits by type.
+
+    Each button shows how many commits of its type are in the report.
+    """
+    counts = collections.Counter(
+        commit.parsed.type for repo in repos.values() for commit in repo.commits
+    )
+    yield "<h2>Toggle commits</h2>\n<div class='toggle-buttons'>\n"
     for commit_type in TOGGLE_TYPES:
         escaped = html.escape(commit_type)
-        row += (
+        yield (
             f"<button data-type='{escaped}' onclick='toggleCommitType(this.dataset.type)'>"
-            f"{escaped}</button>\n"
+            f"{escaped} ({counts[commit_type]})</button>\n"
         )
-    row += "</div>\n"
-    return row
-
+    yield "</div>\n"
 
-def generate_html(repos: dict[str, Repo]) -> None:
-    """Generate an HTML report of the changes."""
-    repo_rows = []
 
-    row = "<h2>Summary</h2>\n"
-    row += generate_versions_table(repos)
-    repo_rows.append(row)
+def generate_repo_html(repo_name: str, repo: Repo) -> Iterator[str]:
+    """Generate the section for a repo, with a table of its commits."""
+    old = html.escape(repo.old or "n/a")
+    new = html.escape(repo.new or "n/a")
+    yield f"<h2>{hyperlink_project(repo_name)} ({old} → {new})</h2>\n"
 
-    repo_rows.append(generate_toggle_buttons_html())
+    if release_notes := hyperlink_release_notes(repo_name):
+        yield f"<div>{release_notes}</div>"
 
+    if not repo.commits:
+        yield "<h4>No commits</h4>\n"
+    else:
+        yield from generate_commit_table(repo_name, repo.commits, repo.pull_requests)
+    yield "\n"
+
+
+def generate_lazy_repo_html(repo_name: str, repo: Repo) -> Iterator[str]:
+    """Generate a collapsed section for a repo, whose rows are rendered when opened."""
+    if not repo.commits:
+        yield from generate_repo_html(repo_name, repo)
+        return
+
+    old = html.escape(repo.old or "n/a")
+    new = html.escape(repo.new or "n/a")
+    count = len(repo.commits)
+    yield "<details class='repo' ontoggle='openLazyTable(this)'>\n"
+    yield (
+        f"<summary><h2>{hyperlink_project(repo_name)} ({old} → {new})</h2> "
+        f"{count} commit{'s' if count != 1 else ''}</summary>\n"
+    )
+    if release_notes := hyperlink_release_notes(repo_name):
+        yield f"<div>{release_notes}</div>"
+    yield from generate_lazy_commit_table(repo_name, repo.commits, repo.pull_requests)
+    yield "</details>\n"
+
+
+def render_html(
+    repos: dict[str, Repo],
+    store: SectionStore | None = None,
+    lazy: bool = False,
+    stats: ContributorStats | None = None,
+) -> Iterator[str]:
+    """Render an HTML report of the changes as a stream of fragments.
+
+    With a ``store``, repo sections are reused from and saved to the store.
+    With ``lazy``, repo sections are collapsed and their commit rows are only
+    rendered by the page when a section is opened. The contributor ``stats``
+    are aggregated from the repos if they aren't given.
+    """
+    head, tail = HTML_TEMPLATE.split("<!-- REPO_ROWS -->")
+    if store:
+        generate_section = store.render
+    elif lazy:
+        generate_section = generate_lazy_repo_html
+    else:
+        generate_section = generate_repo_html
+    stats = stats or get_contributor_stats(repos)
+    yield head
+    yield "<h2>Summary</h2>\n"
+    yield from generate_versions_table(repos, stats)
+    yield "\n"
+    yield from generate_toggle_buttons_html(repos)
     for repo_name, repo in repos.items():
-        row = f"<h2>{hyperlink_project(repo_name)} ({repo.old or 'n/a'} → {repo.new or 'n/a'})</h2>\n"
+        yield from generate_section(repo_name, repo)
+    yield from generate_contributors_html(stats)
+    yield tail
+
+
+def generate_html(
+    repos: dict[str, Repo],
+    path: pathlib.Path = pathlib.Path("contributors.html"),
+    store: SectionStore | None = None,
+    lazy: bool = False,
+    stats: ContributorStats | None = None,
+) -> None:
+    """Generate an HTML report of the changes.
+
+    The report is written to disk as it's rendered, so it's never held in
+    memory as a whole.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(render_html(repos, store, lazy, stats))
+    logger.info(f"Generated report: file://{path.absolute()}")
 
-        if release_notes := hyperlink_release_notes(repo_name):
-            row += f"<div>{release_notes}</div>"
 
-        if not repo.commits:
-            row += "<h4>No commits</h4>\n"
-        else:
-            row += generate_commit_table(repo_name, repo.commits)
+# endregion
+# region incremental reports
 
-        repo_rows.append(row)
+
+@functools.lru_cache(maxsize=1)
+def get_render_version() -> str:
+    """Get a version for rendered sections, which changes whenever this script does."""
+    return hashlib.sha256(pathlib.Path(__file__).read_bytes()).hexdigest()
 
 
-    if contributors_html := generate_contributors_html(repos):
-        repo_rows.append(contributors_html)
+def get_commit_range(name: str, repo: Repo) -> CommitRange | None:
+    """Get the range of commits of a repo, if it has both versions."""
+    if repo.old and repo.new:
+        return CommitRange(name, repo.old, repo.new)
+    return None
 
-    html_content = HTML_TEMPLATE.replace("<!-- REPO_ROWS -->", "\n".join(repo_rows))
 
-    with open("contributors.html", "w", encoding="utf-8") as f:
-        f.write(html_content)
-    logger.info(
-        f"Generated report: file://{pathlib.Path('contributors.html').absolute()}"
-    )
+class SectionStore:
+    """A store of rendered report sections, keyed by repo and versions.
+
+    Each entry holds the commits of a repo and its rendered HTML section.
+    A repo whose versions haven't changed since the previous run is restored
+    from the store instead of being fetched and rendered again. Entries
+    rendered by a different version of this script are ignored. Only ranges
+    between version tags or commit hashes are stored, as a branch can move
+    between runs.
+
+    Sections of lazy reports, and of reports with PR details, are stored apart
+    from regular ones.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path, lazy: bool = False, pull_requests: bool = False
+    ) -> None:
+        self.directory = directory / "sections"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lazy = lazy
+        self.pull_requests = pull_requests
+        self._generate = generate_lazy_repo_html if lazy else generate_repo_html
+        self._sections: dict[CommitRange, str] = {}
+        self._commits: dict[CommitRange, list[Commit]] = {}
+
+    def _path(self, commit_range: CommitRange) -> pathlib.Path:
+        key = "\n".join((commit_range.name, commit_range.old, commit_range.new))
+        if self.lazy:
+            key += "\nlazy"
+        if self.pull_requests:
+            key += "\npull-requests"
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def restore(self, name: str, repo: Repo) -> bool:
+        """Restore the commits of a repo from the store.
+
+        :returns: whether the repo was found in the store.
+        """
+        if not (commit_range := get_commit_range(name, repo)):
+            return False
+        if not (is_pinned_ref(commit_range.old) and is_pinned_ref(commit_range.new)):
+            return False
+        if commit_range in self._commits:
+            # another project of the run shares the range
+            repo.commits = list(self._commits[commit_range])
+            return True
+        try:
+            data = json.loads(self._path(commit_range).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != get_render_version():
+            return False
+        repo.commits = [Commit(**commit) for commit in data["commits"]]
+        self._commits[commit_range] = list(repo.commits)
+        self._sections[commit_range] = data["html"]
+        return True
+
+    def render(self, name: str, repo: Repo) -> Iterator[str]:
+        """Generate the section for a repo, reusing a stored section if possible."""
+        commit_range = get_commit_range(name, repo)
+        if not commit_range:
+            yield from self._generate(name, repo)
+            return
+        if section := self._sections.get(commit_range):
+            yield section
+            return
+
+        section = "".join(self._generate(name, repo))
+        self._sections[commit_range] = section
+        if is_pinned_ref(commit_range.old) and is_pinned_ref(commit_range.new):
+            data = {
+                "version": get_render_version(),
+                "commits": [dataclasses.asdict(commit) for commit in repo.commits],
+                "html": section,
+            }
+            write_atomically(self._path(commit_range), data)
+        yield section
 
 
 # endregion
+# region export
 
 
-def get_libraries(project: str, old_ref: str, new_ref: str) -> dict[str, Repo]:
-    """Get the new and old versions of each library."""
+class Exporter:
+    """Write the data of a project's report as JSON or NDJSON while it's collected.
+
+    The project and version table are written first, then each commit as soon
+    as it's fetched, and the contributors once every commit is in. The file is
+    flushed after each commit, so consumers can follow it during the run.
+
+    An NDJSON export has one record per line, each with a ``record`` field of
+    'project', 'version', 'commit', 'pull_request', 'contribution' or
+    'contributors'. A JSON export is a single object with the same data, which is
+    only complete once the run finishes.
+    """
+
+    def __init__(self, path: pathlib.Path, ndjson: bool = False) -> None:
+        self.path = path
+        self.ndjson = ndjson
+        self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._commits = 0
+
+    def _write_record(self, record: str, data: dict[str, Any]) -> None:
+        self._file.write(json.dumps({"record": record, **data}) + "\n")
+
+    def write_versions(self, project: Project, repos: dict[str, Repo]) -> None:
+        """Write the project and the versions of its repos."""
+        project_data = {
+            "name": project.name,
+            "old": project.old_ref,
+            "new": project.new_ref,
+        }
+        versions = [
+            {"repo": name, "old": repo.old, "new": repo.new}
+            for name, repo in repos.items()
+        ]
+        with self._lock:
+            if self.ndjson:
+                self._write_record("project", project_data)
+                for version in versions:
+                    self._write_record("version", version)
+            else:
+                self._file.write(f'{{"project": {json.dumps(project_data)},\n')
+                self._file.write(f'"versions": {json.dumps(versions)},\n"commits": [')
+            self._file.flush()
+
+    def write_commits(self, repo_name: str, commits: Iterable[Commit]) -> None:
+        """Write commits of a repo."""
+        with self._lock:
+            for commit in commits:
+                parsed = commit.parsed
+                data = {
+                    "repo": repo_name,
+                    **dataclasses.asdict(commit),
+                    "pr": parsed.pr,
+                    "type": parsed.type,
+                    "scope": parsed.scope,
+                    "breaking": parsed.breaking,
+                }
+                if self.ndjson:
+                    self._write_record("commit", data)
+                else:
+                    separator = ",\n" if self._commits else "\n"
+                    self._file.write(separator + json.dumps(data))
+                self._commits += 1
+            self._file.flush()
+
+    def close(self, repos: dict[str, Repo], stats: ContributorStats) -> None:
+        """Write the details of PRs, if any, and the contributors, and close."""
+        pull_requests = [
+            {"repo": name, **dataclasses.asdict(pull_request)}
+            for name, repo in repos.items()
+            for pull_request in repo.pull_requests.values()
+        ]
+        contributions = [
+            {
+                "author": author.login,
+                "commits": author.commits,
+                "pull_requests": len(author.pull_requests),
+                "repos": dict(author.repos),
+                "first": author.first[1].hash if author.first else None,
+                "last": author.last[1].hash if author.last else None,
+            }
+            for author in stats.by_commits
+        ]
+        with self._lock:
+            if self.ndjson:
+                for pull_request in pull_requests:
+                    self._write_record("pull_request", pull_request)
+                for contribution in contributions:
+                    self._write_record("contribution", contribution)
+                self._write_record("contributors", {"authors": stats.logins})
+            else:
+                self._file.write(f'\n],\n"pull_requests": {json.dumps(pull_requests)},')
+                self._file.write(f'\n"contributions": {json.dumps(contributions)},')
+                self._file.write(f'\n"contributors": {json.dumps(stats.logins)}}}\n')
+            self._file.close()
+        logger.info(f"Exported {self._commits} commits: {self.path}")
+
+
+_exporters: dict[CommitRange, list[Exporter]] = collections.defaultdict(list)
+
+
+def add_exporter(exporter: Exporter, repos: dict[str, Repo]) -> None:
+    """Send the commits of each repo to an exporter as they're fetched."""
+    for name, repo in repos.items():
+        if commit_range := get_commit_range(name, repo):
+            _exporters[commit_range].append(exporter)
+
+
+def export_commits(commit_range: CommitRange, commits: Iterable[Commit]) -> None:
+    """Send fetched commits of a range to its exporters."""
+    for exporter in _exporters.get(commit_range, ()):
+        exporter.write_commits(commit_range.name, commits)
+
+
+# endregion
+
+
+def get_libraries(
+    project: str, old_ref: str, new_ref: str, graphql: bool = False
+) -> dict[str, Repo]:
+    """Get the new and old versions of each library.
+
+    Lockfiles recorded in the commit index are read from it. The others are
+    fetched and parsed concurrently, or with ``graphql``, both in one request.
+    """
+    refs = {"old": old_ref, "new": new_ref}
+    versions: dict[str, dict[str, str]] = {}
+    if _index:
+        for attr, ref in refs.items():
+            if (libraries := _index.get_libraries(project, ref)) is not None:
+                logger.debug(f"Using indexed {project} lockfile at {ref}")
+                versions[attr] = libraries
+    missing = {attr: ref for attr, ref in refs.items() if attr not in versions}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        if graphql and len(missing) == len(refs):
+            lock_files = get_uv_lock_files_graphql(project, old_ref, new_ref)
+            futures = {
+                attr: executor.submit(parse_uv_lock_libraries, content)
+                for attr, content in lock_files.items()
+            }
+        else:
+            futures = {}
+            for attr, ref in missing.items():
+                logger.info(f"Getting {attr} {project} lockfile.")
+                futures[attr] = executor.submit(get_lock_libraries, project, ref)
+        for attr, future in futures.items():
+            versions[attr] = future.result()
+            if _index:
+                _index.put_libraries(project, refs[attr], versions[attr])
+
     libraries: dict[str, Repo] = {}
-    for ref, attr in ((old_ref, "old"), (new_ref, "new")):
-        logger.info(f"Getting {attr} {project} lockfile.")
-        lock_file = get_uv_lock_file(project, ref)
-        for pkg in lock_file:
-            name = pkg.get("name")
-            version = pkg.get("version")
-            if name and LIBRARY_PATTERN.match(name):
-                lib = libraries.setdefault(name, Repo())
-                setattr(lib, attr, version)
+    for attr in refs:
+        for name, version in versions[attr].items():
+            lib = libraries.setdefault(name, Repo())
+            setattr(lib, attr, version)
     return libraries
 
 
-def get_contributors(repos: dict[str, Repo]) -> list[str]:
-    """Get a list of contributors, formatted for rst."""
-    authors = {commit.author for repo in repos.values() for commit in repo.commits}
-    return [
-        f":literalref:`@{author} <https://github.com/{author}>`"
-        for author in sorted(authors, key=str.lower)
+def get_lock_libraries(project: str, ref: str) -> dict[str, str]:
+    """Get the version of each library in a project's lockfile at a ref."""
+    with _tracer.span(f"{project} lockfile", "lockfile", ref=ref):
+        content = _backend.get_lock_file(project, ref)
+    return parse_uv_lock_libraries(content)
+
+
+def get_commit_time(commit: Commit) -> datetime.datetime | None:
+    """Get the time of a commit, if known."""
+    if not commit.date:
+        return None
+    try:
+        time = datetime.datetime.fromisoformat(commit.date)
+    except ValueError:
+        logger.debug(f"Ignoring invalid date of commit {commit.hash}: {commit.date}")
+        return None
+    if not time.tzinfo:
+        time = time.replace(tzinfo=datetime.timezone.utc)
+    return time
+
+
+def get_contributor_stats(repos: dict[str, Repo]) -> ContributorStats:
+    """Aggregate the contributions to all repos in a single pass over the commits.
+
+    Commits without a date only count as an author's first or last commit if
+    none of the author's commits have a date.
+    """
+    stats = ContributorStats()
+    times: dict[str, tuple[datetime.datetime, datetime.datetime]] = {}
+    for name, repo in repos.items():
+        if not repo.commits:
+            continue
+        repo_stats = stats.repos[name] = RepoStats()
+        for commit in repo.commits:
+            repo_stats.commits += 1
+            repo_stats.authors[commit.author] += 1
+            author = stats.authors.get(commit.author)
+            if not author:
+                author = stats.authors[commit.author] = AuthorStats(commit.author)
+                author.first = author.last = (name, commit)
+            author.commits += 1
+            author.repos[name] += 1
+            if commit.parsed.pr:
+                author.pull_requests.add((name, int(commit.parsed.pr)))
+
+            if not (time := get_commit_time(commit)):
+                continue
+            if commit.author not in times:
+                times[commit.author] = (time, time)
+                author.first = author.last = (name, commit)
+                continue
+            first, last = times[commit.author]
+            if time < first:
+                first = time
+                author.first = (name, commit)
+            if time >= last:
+                last = time
+                author.last = (name, commit)
+            times[commit.author] = (first, last)
+    stats.logins = sorted(stats.authors, key=str.lower)
+    stats.by_commits = sorted(
+        stats.authors.values(), key=lambda author: -author.commits
+    )
+    stats.rst = [
+        f":literalref:`@{login} <https://github.com/{login}>`" for login in stats.logins
     ]
+    return stats
+
+
+def list_commits(name: str, old: str, new: str) -> list[Commit]:
+    """Collect the commits between two refs into a list.
+
+    Each commit is exported as soon as it's fetched.
+    """
+    commit_range = CommitRange(name, old, new)
+    commits = []
+    linear: set[CommitRange] = set()
+    with _tracer.span(f"{name} commits", "commits", old=old, new=new) as details:
+        for commit in _backend.get_commits(name, old, new, linear if _index else None):
+            commits.append(commit)
+            export_commits(commit_range, (commit,))
+        details["count"] = len(commits)
+    if _index:
+        _index.put_range(commit_range, commits, commit_range in linear)
+    return commits
+
 
+def fetch_commit_ranges(
+    ranges: Sequence[CommitRange], jobs: int = DEFAULT_JOBS, graphql: bool = False
+) -> dict[CommitRange, list[Commit]]:
+    """Fetch the commits in each range.
 
-def parse_repo_changes(repos: dict[str, Repo]) -> None:
+    Ranges are fetched concurrently by ``jobs`` threads. The requests in flight,
+    including page prefetches, are bounded by ``set_max_requests()``.
+    Results are returned in the order of ``ranges``, so the output doesn't
+    depend on which request finishes first.
+
+    Ranges recorded in the commit index are read from it and the others are
+    recorded once fetched. With ``graphql``, all other ranges are fetched at
+    once, and only ranges that GraphQL couldn't compare are fetched over REST.
+    """
+    results: dict[CommitRange, list[Commit] | None] = dict.fromkeys(ranges)
+    if _index:
+        for commit_range in ranges:
+            if (commits := _index.get_range(commit_range)) is not None:
+                logger.debug(f"Using indexed {commit_range.name} commits")
+                export_commits(commit_range, commits)
+                results[commit_range] = commits
+    missing = [commit_range for commit_range in ranges if results[commit_range] is None]
+    if graphql and missing:
+        linear: set[CommitRange] = set()
+        for commit_range, commits in get_commits_graphql(missing, linear).items():
+            if commits is None:
+                continue
+            export_commits(commit_range, commits)
+            if _index:
+                _index.put_range(commit_range, commits, commit_range in linear)
+            results[commit_range] = commits
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            commit_range: executor.submit(
+                list_commits, commit_range.name, commit_range.old, commit_range.new
+            )
+            for commit_range, commits in results.items()
+            if commits is None
+        }
+        for commit_range, future in futures.items():
+            results[commit_range] = future.result()
+    return {commit_range: commits or [] for commit_range, commits in results.items()}
+
+
+def parse_repo_changes(
+    repos: dict[str, Repo], jobs: int = DEFAULT_JOBS, graphql: bool = False
+) -> None:
     """Parse changes made in each repo.
 
     Updates repo dict in-place.
     """
-    for name, repo in repos.items():
-        if not repo.old or not repo.new:
-            logger.debug(
-                f"Not getting commits for {name} because it's missing version data."
-            )
-        elif repo.old == repo.new:
-            logger.debug(f"Not getting commits for {name} because it wasn't updated.")
-        else:
-            repo.commits = get_commits(name, repo.old, repo.new)
+    parse_batch_changes([repos], jobs=jobs, graphql=graphql)
+
+
+def parse_batch_changes(
+    repo_sets: Sequence[dict[str, Repo]],
+    jobs: int = DEFAULT_JOBS,
+    graphql: bool = False,
+) -> None:
+    """Parse changes made in the repos of several projects.
+
+    Projects often share library bumps, so identical ranges are fetched once
+    and their commits are shared between projects.
+
+    Updates each repo dict in-place.
+    """
+    ranges: dict[CommitRange, None] = {}
+    for repos in repo_sets:
+        for name, repo in repos.items():
+            if not repo.old or not repo.new:
+                logger.debug(
+                    f"Not getting commits for {name} because it's missing version data."
+                )
+            elif repo.old == repo.new:
+                logger.debug(
+                    f"Not getting commits for {name} because it wasn't updated."
+                )
+            else:
+                ranges[CommitRange(name, repo.old, repo.new)] = None
+
+    if len(repo_sets) > 1:
+        requested = sum(len(repos) for repos in repo_sets)
+        logger.debug(f"Getting {len(ranges)} unique ranges for {requested} repos.")
+    commits = fetch_commit_ranges(list(ranges), jobs=jobs, graphql=graphql)
+
+    for repos in repo_sets:
+        for name, repo in repos.items():
+            if repo.old and repo.new:
+                repo.commits = list(
+                    commits.get(CommitRange(name, repo.old, repo.new), [])
+                )
 
 
 def main(argv: Sequence[str] | None = None) -> int:
     args = parse_args(argv)
     set_verbosity(args.verbose)
-
-    repos: dict[str, Repo] = {args.project: Repo(old=args.old_ref, new=args.new_ref)}
-    repos.update(get_libraries(args.project, args.old_ref, args.new_ref))
-
-    parse_repo_changes(repos)
+    profiler = Profiler() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        return run(args)
+    finally:
+        if profiler:
+            profiler.dump(args.profile)
+        if args.trace:
+            _tracer.write_chrome_trace(args.trace)
+
+
+def run(args: argparse.Namespace) -> int:
+    """Generate the reports for parsed command line args.
+
+    Each run starts with fresh instrumentation and rate limit state, and the
+    module state it sets up is reset when it ends, so that several runs in one
+    process don't affect each other.
+    """
+    global _tracer, _rate_limiter
+    _tracer = Tracer()
+    _rate_limiter = RateLimiter()
+    try:
+        return generate_reports(args)
+    finally:
+        reset_run_state()
+
+
+def reset_run_state() -> None:
+    """Reset the cache, request limit, transport, backend, index and exporters."""
+    set_cache(None)
+    set_max_requests(DEFAULT_JOBS)
+    set_transport(ConnectionPool())
+    set_backend(GithubBackend())
+    set_index(None)
+    _exporters.clear()
+
+
+def generate_reports(args: argparse.Namespace) -> int:
+    """Set up the run and generate the reports for parsed command line args."""
+    # a cassette has to hold complete responses, rather than 304s for cached ones
+    cassette = args.record or args.replay
+    set_cache(args.cache_dir if args.cache and not cassette else None)
+    set_max_requests(args.jobs)
+    if args.record:
+        set_transport(RecordingTransport(ConnectionPool(), args.record))
+    elif args.replay:
+        try:
+            set_transport(ReplayTransport(args.replay))
+        except (OSError, ValueError) as e:
+            logger.error(f"Couldn't load cassette: {e}")
+            return os.EX_DATAERR
+    if args.backend == "git":
+        set_backend(GitBackend(args.cache_dir, args.git_url, args.login_lookup))
+    if args.index or args.index_stats:
+        index = CommitIndex(args.cache_dir / "commits.sqlite")
+        if args.index_stats:
+            log_index_stats(index)
+            index.close()
+            return os.EX_OK
+        set_index(index)
+
+    if args.manifest:
+        try:
+            projects = load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            logger.error(f"Couldn't load manifest: {e}")
+            return os.EX_DATAERR
+    else:
+        projects = [Project(args.project, args.old_ref, args.new_ref, args.output)]
+
+    # look up the token before requests are sent from several threads
+    token = get_token()
+    graphql = args.graphql
+    if graphql and not token and not args.replay:
+        logger.warning("The GraphQL API requires a token, falling back to REST.")
+        graphql = False
+    pull_requests = args.pull_requests
+    if pull_requests and not token and not args.replay:
+        logger.warning("Getting PR details requires a token, skipping them.")
+        pull_requests = False
+
+    reports: list[tuple[Project, dict[str, Repo]]] = []
+    with _tracer.span("lockfiles"):
+        for project in projects:
+            repos = {project.name: Repo(old=project.old_ref, new=project.new_ref)}
+            repos.update(
+                get_libraries(
+                    project.name, project.old_ref, project.new_ref, graphql=graphql
+                )
+            )
+            reports.append((project, repos))
+
+    store = None
+    if args.incremental:
+        store = SectionStore(args.cache_dir, args.lazy, pull_requests)
+    repo_sets = [repos for _, repos in reports]
+    if store:
+        repo_sets = [
+            {
+                name: repo
+                for name, repo in repos.items()
+                if not store.restore(name, repo)
+            }
+            for repos in repo_sets
+        ]
+        restored = sum(len(repos) for _, repos in reports) - sum(map(len, repo_sets))
+        logger.info(f"Reusing {restored} unchanged report sections.")
+
+    exporters: list[Exporter] = []
+    if args.format:
+        for (project, repos), pending in zip(reports, repo_sets):
+            path = project.output.with_suffix(f".{args.format}")
+            exporter = Exporter(path, ndjson=args.format == "ndjson")
+            exporter.write_versions(project, repos)
+            for name, repo in repos.items():
+                if name not in pending:
+                    exporter.write_commits(name, repo.commits)
+            add_exporter(exporter, pending)
+            exporters.append(exporter)
+
+    with _tracer.span("commits"):
+        parse_batch_changes(repo_sets, jobs=args.jobs, graphql=graphql)
+    if pull_requests:
+        pr_cache = None
+        if args.cache and not cassette:
+            pr_cache = PullRequestCache(args.cache_dir / "pull-requests.json")
+        with _tracer.span("pull requests"):
+            enrich_pull_requests((repos for _, repos in reports), pr_cache)
+    stats = [get_contributor_stats(repos) for _, repos in reports]
+    for exporter, (_, repos), project_stats in zip(exporters, reports, stats):
+        exporter.close(repos, project_stats)
 
     if args.verbose:
-        log_versions(repos)
-        log_commits(repos)
-        log_contributors(repos)
-
-    generate_html(repos)
+        for (project, repos), project_stats in zip(reports, stats):
+            if len(reports) > 1:
+                logger.info(f"\n# {project.name}\n")
+            log_versions(repos)
+            log_commits(repos)
+            log_contributors(project_stats)
+
+    _backend.close()
+    if _index:
+        _index.close()
+    _transport.close()
+    logger.info(_rate_limiter.summary())
+
+    with _tracer.span("render"):
+        for (project, repos), project_stats in zip(reports, stats):
+            generate_html(repos, project.output, store, args.lazy, project_stats)
+    if _cache:
+        _cache.prune()
+    if args.verbose:
+        _tracer.log_summary()
     return os.EX_OK
 
 
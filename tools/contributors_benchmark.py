@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import sys
+
+if sys.version_info < (3, 11):
+    raise SystemExit(
+        "Error: this script requires Python 3.11 or higher. "
+        "Use a higher version of python with uv:\n"
+        'uv run --python ">=3.11" ./contributors_benchmark.py'
+    )
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import re
+import resource
+import subprocess
+import tempfile
+import textwrap
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+"""
+Benchmarks contributors.py against a local stand-in for the Github API.
+
+Each scenario starts a fake Github server with synthetic repos, runs
+contributors.py against it in a subprocess, and records the wall time of each
+phase, the number of requests and the peak memory use.
+
+See usage and examples with:
+
+  ./contributors_benchmark.py --help
+"""
+
+logger = logging.getLogger(__name__)
+
+PROJECT = "project"
+"""Name of the synthetic project."""
+
+OLD_REF = "1.0.0"
+"""Old ref of the synthetic project."""
+
+NEW_REF = "2.0.0"
+"""New ref of the synthetic project."""
+
+COMMIT_TYPES = ("feat", "fix", "docs", "build", "ci", "test", "style", "refactor")
+"""Conventional-commit types used for synthetic commit headers."""
+
+AUTHORS = 37
+"""Number of distinct synthetic authors."""
+
+
+@dataclass
+class FakeGithubConfig:
+    """The shape and behaviour of the fake Github API."""
+
+    libraries: int = 10
+    """Number of craft libraries in the project's lockfile."""
+
+    commits: int = 100
+    """Number of commits between the old and new ref of each repo."""
+
+    latency: float = 0.05
+    """Delay before each response, in seconds."""
+
+    max_page_size: int = 100
+    """Maximum number of commits in a page of compare results."""
+
+    files: int = 100
+    """Number of changed files, with patches, in each compare response."""
+
+    patch_lines: int = 20
+    """Number of changed lines in the patch of each file."""
+
+    rate_limit: int = 5000
+    """Number of requests allowed before the rate limit runs out."""
+
+
+@dataclass
+class Scenario:
+    """A benchmark scenario."""
+
+    description: str
+    """What the scenario measures."""
+
+    config: FakeGithubConfig = field(default_factory=FakeGithubConfig)
+    """The fake Github API to run against."""
+
+    options: dict[str, Any] = field(default_factory=dict)
+    """Options for the run, see ``run_contributors``."""
+
+    warm: bool = False
+    """Whether to measure a second run, reusing the cache or cassette of the first."""
+
+
+SCENARIOS = {
+    "small": Scenario("10 libraries with 100 commits each."),
+    "large": Scenario(
+        "50 libraries with 200 commits each.",
+        FakeGithubConfig(libraries=50, commits=200),
+    ),
+    "large-serial": Scenario(
+        "The large scenario, one request at a time.",
+        FakeGithubConfig(libraries=50, commits=200),
+        {"jobs": 1},
+    ),
+    "large-warm": Scenario(
+        "The large scenario, with the cache of a previous run.",
+        FakeGithubConfig(libraries=50, commits=200),
+        warm=True,
+    ),
+    "large-graphql": Scenario(
+        "The large scenario, with the GraphQL engine.",
+        FakeGithubConfig(libraries=50, commits=200),
+        {"graphql": True},
+    ),
+    "large-replay": Scenario(
+        "The large scenario, replayed from a cassette of a previous run.",
+        FakeGithubConfig(libraries=50, commits=200),
+        {"cassette": "replay"},
+        warm=True,
+    ),
+    "prs": Scenario(
+        "The small scenario, with the details of every PR.",
+        options={"pull_requests": True},
+    ),
+    "prs-warm": Scenario(
+        "The prs scenario, with the cache of a previous run.",
+        options={"pull_requests": True},
+        warm=True,
+    ),
+    "huge": Scenario(
+        "20 libraries with 2500 commits each.",
+        FakeGithubConfig(libraries=20, commits=2500),
+    ),
+    "large-diffs": Scenario(
+        "20 libraries with 300 commits and 300 large diffs each.",
+        FakeGithubConfig(libraries=20, commits=300, files=300, patch_lines=200),
+    ),
+}
+"""Benchmark scenarios by name."""
+
+
+# region fake Github API
+
+
+def get_sha(name: str, index: int) -> str:
+    """Get the hash of a synthetic commit."""
+    return hashlib.sha1(f"{name}:{index}".encode()).hexdigest()
+
+
+def get_lock_file(config: FakeGithubConfig, ref: str) -> str:
+    """Get the uv lockfile of the synthetic project at a ref."""
+    version = "1.0" if ref == OLD_REF else "2.0"
+    packages = [(PROJECT, ref)]
+    packages += [(f"craft-lib-{i}", version) for i in range(config.libraries)]
+    packages += [(f"dependency-{i}", version) for i in range(config.libraries)]
+    return "version = 1\n\n" + "\n".join(
+        f'[[package]]\nname = "{name}"\nversion = "{pkg_version}"\n'
+        f'source = {{ registry = "https://pypi.org/simple" }}\n'
+        for name, pkg_version in packages
+    )
+
+
+def get_commit(name: str, index: int) -> dict[str, Any]:
+    """Get a synthetic commit as returned by the compare API."""
+    commit_type = COMMIT_TYPES[index % len(COMMIT_TYPES)]
+    login = f"user-{index % AUTHORS}"
+    date = f"2025-{index % 12 + 1:02d}-{index % 28 + 1:02d}T12:00:00Z"
+    return {
+        "sha": get_sha(name, index),
+        "commit": {
+            "message": (
+                f"{commit_type}: change {index} in {name} (#{index + 1})\n\nDetails."
+            ),
+            "author": {"name": login, "email": f"{login}@example.com", "date": date},
+        },
+        "author": {"login": login},
+    }
+
+
+class FakeGithub(ThreadingHTTPServer):
+    """A local stand-in for the parts of the Github API used by contributors.py.
+
+    Serves the contents, compare and GraphQL endpoints for a synthetic project
+    whose lockfile lists ``config.libraries`` craft libraries, each with
+    ``config.commits`` commits between its old and new version.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: FakeGithubConfig) -> None:
+        super().__init__(("127.0.0.1", 0), FakeGithubHandler)
+        self.config = config
+        self.requests = 0
+        self.bytes_sent = 0
+        self.remaining = config.rate_limit
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    """Request handler for the fake Github API."""
+
+    protocol_version = "HTTP/1.1"
+    server: FakeGithub
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+    def send(self, status: int, body: bytes = b"", etag: str | None = None) -> None:
+        """Send a response with rate-limit headers."""
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes_sent += len(body)
+            if status != 304:
+                self.server.remaining = max(self.server.remaining - 1, 0)
+            remaining = self.server.remaining
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Limit", str(self.server.config.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(remaining))
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.config.latency)
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        etag = f'"{hashlib.sha1(self.path.encode()).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send(304)
+            return
+
+        if re.fullmatch(r"/repos/[^/]+/[^/]+/contents/uv.lock", parts.path):
+            content = get_lock_file(self.server.config, query["ref"][0])
+            if "raw" in self.headers.get("Accept", ""):
+                body = content.encode()
+            else:
+                encoded = base64.b64encode(content.encode()).decode()
+                body = json.dumps({"content": encoded}).encode()
+        elif match := re.fullmatch(
+            r"/repos/[^/]+/([^/]+)/compare/(.+)\.\.\.(.+)", parts.path
+        ):
+            body = json.dumps(self.compare(match.group(1), query)).encode()
+        else:
+            self.send(404, b'{"message": "Not Found"}')
+            return
+        self.send(200, body, etag)
+
+    def compare(self, name: str, query: dict[str, list[str]]) -> dict[str, Any]:
+        """Get a page of compare results."""
+        config = self.server.config
+        per_page = min(int(query.get("per_page", ["250"])[0]), config.max_page_size)
+        page = int(query.get("page", ["1"])[0])
+        start = (page - 1) * per_page
+        stop = min(start + per_page, config.commits)
+        return {
+            "status": "ahead",
+            "total_commits": config.commits,
+            "commits": [get_commit(name, index) for index in range(start, stop)],
+            "files": [
+                {
+                    "filename": f"src/{name}/module_{index}.py",
+                    "status": "modified",
+                    "patch": "@@ -1,3 +1,3 @@\n-old line\n+new line\n"
+                    * config.patch_lines,
+                }
+                for index in range(config.files)
+            ],
+        }
+
+    def do_POST(self) -> None:
+        time.sleep(self.server.config.latency)
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length))
+        query, variables = request["query"], request["variables"]
+        if "pullRequest(number" in query:
+            data = {}
+            # one aliased repository per name variable, in order, each with its PRs
+            for index, fields in enumerate(query.split(": repository(")[1:]):
+                data[f"r{index}"] = {
+                    f"p{number}": self.graphql_pull_request(int(number))
+                    for number in re.findall(r"p(\d+): pullRequest", fields)
+                }
+        elif "object(expression" in query:
+            data: dict[str, Any] = {
+                "repository": {
+                    attr: {
+                        "text": get_lock_file(
+                            self.server.config, variables[attr].split(":")[0]
+                        ),
+                        "isTruncated": False,
+                    }
+                    for attr in ("old", "new")
+                }
+            }
+        else:
+            data = {}
+            index = 0
+            while f"name{index}" in variables:
+                data[f"r{index}"] = self.graphql_compare(
+                    variables[f"name{index}"], variables[f"after{index}"]
+                )
+                index += 1
+        self.send(200, json.dumps({"data": data}).encode())
+
+    def graphql_pull_request(self, number: int) -> dict[str, Any]:
+        """Get the details of a synthetic PR."""
+        return {
+            "number": number,
+            "title": f"Change {number}",
+            "state": "MERGED",
+            "mergedAt": "2025-01-01T12:00:00Z",
+            "labels": {"nodes": [{"name": "enhancement"}]},
+            "closingIssuesReferences": {"nodes": [{"number": number + 10000}]},
+        }
+
+    def graphql_compare(self, name: str, after: str | None) -> dict[str, Any]:
+        """Get a page of GraphQL compare results."""
+        start = int(after or 0)
+        stop = min(start + 100, self.server.config.commits)
+        nodes = []
+        for index in range(start, stop):
+            commit = get_commit(name, index)
+            nodes.append(
+                {
+                    "oid": commit["sha"],
+                    "message": commit["commit"]["message"],
+                    "authoredDate": commit["commit"]["author"]["date"],
+                    "author": {
+                        "name": commit["author"]["login"],
+                        "user": {"login": commit["author"]["login"]},
+                    },
+                }
+            )
+        commits = {
+            "pageInfo": {
+                "hasNextPage": stop < self.server.config.commits,
+                "endCursor": str(stop),
+            },
+            "nodes": nodes,
+        }
+        return {"ref": {"compare": {"status": "AHEAD", "commits": commits}}}
+
+
+# endregion
+# region scenarios
+
+
+PHASES = {
+    "lockfiles": "lockfiles",
+    "commits": "commits",
+    "pull requests": "prs",
+    "render": "render",
+}
+"""Columns of the results table, by the name of the phase span in contributors.py."""
+
+
+def run_contributors(
+    cache_dir: pathlib.Path,
+    jobs: int = 8,
+    graphql: bool = False,
+    cassette: str | None = None,
+    pull_requests: bool = False,
+) -> dict[str, Any]:
+    """Run contributors.py through its command line and time each phase.
+
+    Must run in a fresh process with GITHUB_API_URL pointing at the fake server,
+    since contributors.py reads it on import. The time of each phase is read
+    from the spans that contributors.py records.
+
+    :param cassette: "record" to record the responses to a cassette in the cache
+        directory, or "replay" to serve them from it.
+    :param pull_requests: whether to get the details of PRs.
+    """
+    sys.path.insert(0, str(pathlib.Path(__file__).parent))
+    import contributors
+
+    output = cache_dir / "contributors.html"
+    argv = [
+        "--project",
+        PROJECT,
+        "--old-ref",
+        OLD_REF,
+        "--new-ref",
+        NEW_REF,
+        "--output",
+        str(output),
+        "--cache-dir",
+        str(cache_dir),
+        "--jobs",
+        str(jobs),
+    ]
+    if graphql:
+        argv.append("--graphql")
+    if pull_requests:
+        argv.append("--pull-requests")
+    if cassette:
+        argv += [f"--{cassette}", str(cache_dir / "cassette.json.gz")]
+    if contributors.main(argv) != os.EX_OK:
+        raise RuntimeError(f"contributors.py failed with {argv}")
+
+    timings = {
+        PHASES[span.name]: span.duration
+        for span in contributors._tracer.spans
+        if span.category == "phase" and span.name in PHASES
+    }
+    return {
+        "timings": timings,
+        # each commit row of the report has one checkbox cell
+        "commits": output.read_text(encoding="utf-8").count(
+            "<td onclick='toggleCheckbox("
+        ),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+@dataclass
+class Result:
+    """The measurements of a scenario."""
+
+    scenario: str
+    """Name of the scenario."""
+
+    wall_time: float
+    """Total time of the run, in seconds."""
+
+    timings: dict[str, float]
+    """Time of each phase, in seconds."""
+
+    requests: int
+    """Number of requests handled by the fake server."""
+
+    bytes_sent: int
+    """Number of response body bytes sent by the fake server."""
+
+    commits: int
+    """Number of commits in the report."""
+
+    peak_rss_mib: float
+    """Peak resident memory of the run, in MiB."""
+
+
+def run_worker(
+    server: FakeGithub, cache_dir: pathlib.Path, options: dict[str, Any]
+) -> dict[str, Any]:
+    """Run contributors.py in a subprocess, so that its peak memory is its own."""
+    env = {
+        **os.environ,
+        "GITHUB_API_URL": server.url,
+        "GITHUB_GRAPHQL_URL": f"{server.url}/graphql",
+        "GITHUB_TOKEN": "benchmark",
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--worker",
+            json.dumps({"cache_dir": str(cache_dir), **options}),
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def run_scenario(name: str, scenario: Scenario) -> Result:
+    """Run a scenario against a fresh fake server."""
+    server = FakeGithub(scenario.config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = pathlib.Path(tmp)
+            if scenario.warm:
+                options = dict(scenario.options)
+                if options.get("cassette") == "replay":
+                    options["cassette"] = "record"
+                run_worker(server, cache_dir, options)
+            requests, bytes_sent = server.requests, server.bytes_sent
+            start = time.perf_counter()
+            data = run_worker(server, cache_dir, scenario.options)
+            wall_time = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return Result(
+        scenario=name,
+        wall_time=wall_time,
+        timings=data["timings"],
+        requests=server.requests - requests,
+        bytes_sent=server.bytes_sent - bytes_sent,
+        commits=data["commits"],
+        peak_rss_mib=data["peak_rss_mib"],
+    )
+
+
+def log_results(results: list[Result]) -> None:
+    """Log the results in a table."""
+    logger.info(
+        f"{'scenario':<15} {'wall':>7} {'lockfiles':>9} {'commits':>8} {'prs':>6}"
+        f" {'render':>7} {'requests':>8} {'MiB sent':>8} {'#commits':>8}"
+        f" {'peak MiB':>8}"
+    )
+    for result in results:
+        timings = result.timings
+        logger.info(
+            f"{result.scenario:<15} {result.wall_time:>6.2f}s"
+            f" {timings['lockfiles']:>8.2f}s {timings['commits']:>7.2f}s"
+            f" {timings.get('prs', 0):>5.2f}s {timings['render']:>6.2f}s"
+            f" {result.requests:>8} {result.bytes_sent / 2**20:>8.1f}"
+            f" {result.commits:>8} {result.peak_rss_mib:>8.1f}"
+        )
+
+
+# endregion
+
+
+def build_parser() -> argparse.ArgumentParser:
+    scenarios = "\n".join(
+        f"  {name:<15} {scenario.description}" for name, scenario in SCENARIOS.items()
+    )
+    parser = argparse.ArgumentParser(
+        prog="contributors_benchmark",
+        description=textwrap.dedent(
+            """
+            Summary:
+              Benchmarks contributors.py against a local stand-in for the Github API.
+
+            Example:
+              contributors_benchmark --scenario small --scenario large
+
+            Scenarios:
+            """
+        )
+        + scenarios,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="A scenario to run. Can be repeated. Runs all scenarios by default.",
+    )
+    parser.add_argument(
+        "--json",
+        type=pathlib.Path,
+        help="Also write the results to a JSON file.",
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.worker:
+        options = json.loads(args.worker)
+        cache_dir = pathlib.Path(options.pop("cache_dir"))
+        print(json.dumps(run_contributors(cache_dir, **options)))
+        return os.EX_OK
+
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        logger.info(f"Running {name}: {SCENARIOS[name].description}")
+        results.append(run_scenario(name, SCENARIOS[name]))
+    log_results(results)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps([asdict(result) for result in results], indent=2)
+        )
+    return os.EX_OK
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
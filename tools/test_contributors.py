@@ -0,0 +1,247 @@
+"""
+Tests for contributors.py.
+
+Run them from the repo root with:
+
+    python3 -m unittest discover -s tools
+"""
+
+import json
+import pathlib
+import re
+import tempfile
+import textwrap
+import unittest
+import unittest.mock
+
+import contributors
+
+
+class LoadManifestTest(unittest.TestCase):
+    """Tests for ``load_manifest``."""
+
+    def load(self, name: str, text: str) -> list[contributors.Project]:
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory, name)
+            path.write_text(textwrap.dedent(text), encoding="utf-8")
+            return contributors.load_manifest(path)
+
+    def test_toml(self) -> None:
+        projects = self.load(
+            "manifest.toml",
+            """\
+            [[project]]
+            name = "rockcraft"
+            old-ref = "1.16.0"
+            new-ref = "1.17.0"
+
+            [[project]]
+            name = "snapcraft"
+            old-ref = 8.0
+            new-ref = "main"
+            output = "snapcraft.html"
+            """,
+        )
+        self.assertEqual(
+            projects,
+            [
+                contributors.Project(
+                    "rockcraft",
+                    "1.16.0",
+                    "1.17.0",
+                    pathlib.Path("contributors-rockcraft.html"),
+                ),
+                contributors.Project(
+                    "snapcraft", "8.0", "main", pathlib.Path("snapcraft.html")
+                ),
+            ],
+        )
+
+    def test_json(self) -> None:
+        manifest = {"project": [{"name": "a", "old-ref": "1", "new-ref": "2"}]}
+        projects = self.load("manifest.json", json.dumps(manifest))
+        self.assertEqual([project.name for project in projects], ["a"])
+
+    def test_invalid(self) -> None:
+        manifests = {
+            "syntax": '{"project": [',
+            "not a table": "[]",
+            "projects not a list": '{"project": {"name": "a"}}',
+            "project not a table": '{"project": ["a"]}',
+            "name not a string": (
+                '{"project": [{"name": 1, "old-ref": 1, "new-ref": 2}]}'
+            ),
+            "output not a string": (
+                '{"project": [{"name": "a", "old-ref": 1, "new-ref": 2, "output": 3}]}'
+            ),
+            "missing ref": '{"project": [{"name": "a", "old-ref": "1"}]}',
+            "no projects": '{"project": []}',
+            "same output": (
+                '{"project": [{"name": "a", "old-ref": 1, "new-ref": 2, "output": "x"},'
+                ' {"name": "b", "old-ref": 1, "new-ref": 2, "output": "x"}]}'
+            ),
+        }
+        for case, text in manifests.items():
+            with self.subTest(case), self.assertRaises(ValueError):
+                self.load("manifest.json", text)
+
+
+LOCK_FILE = textwrap.dedent(
+    """\
+    version = 1
+    requires-python = ">=3.10"
+
+    [[package]]
+    name = "craft-application"
+    version = "5.0.0"
+    source = { registry = "https://pypi.org/simple" }
+    dependencies = [
+        { name = "craft-cli" },
+    ]
+
+    [[package]]
+    name = "craft-cli"
+    version = "3.0.0"
+    source = { registry = "https://pypi.org/simple" }
+
+    [[package]]
+    name = "craft-parts"
+    source = { editable = "." }
+
+    [[package]]
+    name = "pyyaml"
+    version = "6.0.2"
+    source = { registry = "https://pypi.org/simple" }
+    """
+)
+
+
+class LockFileTest(unittest.TestCase):
+    """Tests for ``scan_uv_lock_libraries`` and ``parse_uv_lock_libraries``."""
+
+    def test_scan(self) -> None:
+        self.assertEqual(
+            contributors.scan_uv_lock_libraries(LOCK_FILE),
+            {"craft-application": "5.0.0", "craft-cli": "3.0.0"},
+        )
+
+    def test_scan_unexpected_layout(self) -> None:
+        content = LOCK_FILE.replace(
+            'name = "craft-cli"\nversion = "3.0.0"\n',
+            'version = "3.0.0"\nname = "craft-cli"\n',
+        )
+        self.assertIsNone(contributors.scan_uv_lock_libraries(content))
+        self.assertEqual(
+            contributors.parse_uv_lock_libraries(content),
+            {"craft-application": "5.0.0", "craft-cli": "3.0.0"},
+        )
+
+    def test_scan_matches_toml(self) -> None:
+        """The scan finds the same packages as tomllib in a real lockfile."""
+        path = pathlib.Path(__file__).parents[1] / "uv.lock"
+        content = path.read_text(encoding="utf-8")
+        expected = {
+            package["name"]: package["version"]
+            for package in contributors.parse_uv_lock_file(content)
+            if "version" in package
+        }
+        with unittest.mock.patch.object(
+            contributors, "LIBRARY_PATTERN", re.compile(".*")
+        ):
+            self.assertEqual(contributors.scan_uv_lock_libraries(content), expected)
+
+
+class JsonMemberFilterTest(unittest.TestCase):
+    """Tests for ``JsonMemberFilter``, against ``json.loads``."""
+
+    documents = [
+        {
+            "files": [{"patch": '-"a\\b"\n+{"c": [1, 2]}', "status": "modified"}],
+            "total_commits": 2,
+            "commits": [{"sha": "1", "commit": {"message": 'fix: "files": {'}}],
+        },
+        {"url": "x\\", "files": '"\\"', "status": "ahead"},
+        {"a": {"files": [1]}, "files": {"b": [None, True, -1.5e3]}, "c": "é"},
+        {'files"': 1, "fil": 2, "files": None},
+        {},
+    ]
+
+    def filter(self, chunks: list[bytes]) -> object:
+        json_filter = contributors.JsonMemberFilter(["files"])
+        return json.loads(b"".join(json_filter.feed(chunk) for chunk in chunks))
+
+    def expected(self, document: dict[str, object]) -> object:
+        return {
+            key: None if key == "files" else value for key, value in document.items()
+        }
+
+    def test_split_anywhere(self) -> None:
+        """Two chunks, split at every byte, even inside strings and escapes."""
+        for document in self.documents:
+            data = json.dumps(document, ensure_ascii=False).encode()
+            for split in range(len(data) + 1):
+                with self.subTest(data=data, split=split):
+                    self.assertEqual(
+                        self.filter([data[:split], b"", data[split:]]),
+                        self.expected(document),
+                    )
+
+    def test_byte_at_a_time(self) -> None:
+        for document in self.documents:
+            data = json.dumps(document, indent=1).encode()
+            with self.subTest(data=data):
+                chunks = [data[pos : pos + 1] for pos in range(len(data))]
+                self.assertEqual(self.filter(chunks), self.expected(document))
+
+
+class CommitIndexTest(unittest.TestCase):
+    """Tests for answering ranges from ``CommitIndex``."""
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index = contributors.CommitIndex(
+            pathlib.Path(directory.name, "commits.sqlite")
+        )
+        self.addCleanup(self.index.close)
+        self.commits = {
+            sha: contributors.Commit(sha, f"fix: {sha}", "author", None)
+            for sha in ("a", "b", "c", "d", "e")
+        }
+
+    def put(self, old: str, new: str, shas: str, linear: bool = True) -> None:
+        commits = [self.commits[sha] for sha in shas]
+        commit_range = contributors.CommitRange("craft-parts", old, new)
+        self.index.put_range(commit_range, commits, linear)
+
+    def get(self, old: str, new: str) -> str | None:
+        commit_range = contributors.CommitRange("craft-parts", old, new)
+        commits = self.index.get_range(commit_range)
+        return None if commits is None else "".join(c.hash for c in commits)
+
+    def test_chained_ranges(self) -> None:
+        self.put("2.1", "2.3", "ab")
+        self.put("2.3", "2.6", "cd")
+        self.assertEqual(self.get("2.1", "2.6"), "abcd")
+        self.assertEqual(self.get("2.6", "2.1"), "")
+
+    def test_overlapping_ranges(self) -> None:
+        self.put("2.1", "2.6", "abcd")
+        self.put("2.1", "2.3", "ab")
+        self.assertEqual(self.get("2.3", "2.6"), "cd")
+
+    def test_unconnected_ranges(self) -> None:
+        self.put("2.1", "2.3", "ab")
+        self.put("2.3", "2.6", "cd", linear=False)
+        self.put("2.6", "2.7", "e")
+        self.assertIsNone(self.get("2.1", "2.6"))
+        self.assertIsNone(self.get("2.1", "2.7"))
+        self.assertEqual(self.get("2.3", "2.6"), "cd")
+
+    def test_unpinned_refs(self) -> None:
+        self.put("2.1", "main", "ab")
+        self.assertIsNone(self.get("2.1", "main"))
+
+
+if __name__ == "__main__":
+    unittest.main()